@@ -44,6 +44,8 @@ import vidcutter
 
 setup_requires = ['setuptools']
 install_requires = ['typing'] if sys.version_info < (3, 5) else []
+# numpy is optional, detection interval math falls back to plain python without it
+extras_require = {'speedups': ['numpy']}
 
 # --------------------------------------------------------------------------- #
 
@@ -76,6 +78,7 @@ try:
         packages=['vidcutter', 'vidcutter.libs'],
         setup_requires=setup_requires,
         install_requires=install_requires,
+        extras_require=extras_require,
         data_files=SetupHelpers.get_data_files(),
         ext_modules=extensions,
         entry_points={'gui_scripts': ['vidcutter = vidcutter.__main__:main']},
@@ -58,7 +58,7 @@ signal.signal(signal.SIGTERM, signal.SIG_DFL)
 class MainWindow(QMainWindow):
     EXIT_CODE_REBOOT = 666
     TEMP_PROJECT_FILE = 'vidcutter_reboot.vcp'
-    WORKING_FOLDER = os.path.join(QDir.tempPath(), 'vidcutter')
+    EXPORT_JOURNAL = 'vidcutter_export.journal'
 
     def __init__(self):
         super(MainWindow, self).__init__()
@@ -84,6 +84,8 @@ class MainWindow(QMainWindow):
             self.video = os.path.join(QDir.tempPath(), MainWindow.TEMP_PROJECT_FILE)
         if self.video:
             self.file_opener(self.video)
+        if self.cutter.journal.pending:
+            self.cutter.resumeExport()
 
     def init_scale(self) -> None:
         screen_size = qApp.desktop().availableGeometry(-1)
@@ -261,10 +263,21 @@ class MainWindow(QMainWindow):
         QMessageBox.critical(self, 'An error occurred' if title is None else title, msg, QMessageBox.Ok)
         logging.error(msg)
 
+    @staticmethod
+    def workingFolder() -> str:
+        # kept out of the temp folder, which is wiped on reboot on most systems, so an export can still resume
+        return os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'work')
+
+    @staticmethod
+    def journalPath() -> str:
+        return os.path.join(QStandardPaths.writableLocation(QStandardPaths.AppDataLocation), MainWindow.EXPORT_JOURNAL)
+
     @staticmethod
     @pyqtSlot()
     def cleanup():
-        shutil.rmtree(MainWindow.WORKING_FOLDER, ignore_errors=True)
+        # work files of an unfinished export are kept so it can be resumed on next launch
+        if not os.path.isfile(MainWindow.journalPath()):
+            shutil.rmtree(MainWindow.workingFolder(), ignore_errors=True)
 
     def contextMenuEvent(self, event: QContextMenuEvent) -> None:
         if event.reason() in {QContextMenuEvent.Mouse, QContextMenuEvent.Keyboard}:
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+import logging
+import os
+import re
+import shlex
+import shutil
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QProcess, QThread
+
+from vidcutter.libs.intervals import mergeIntervals
+from vidcutter.libs.munch import Munch
+
+
+class AnalysisJob(QObject):
+    updated = pyqtSignal(float, float)
+    completed = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    released = pyqtSignal()
+
+    # chunks shorter than this are not worth the cost of another decoder process
+    minChunkLength = 30
+    # intervals closer than this across a chunk border are treated as one
+    borderTolerance = 0.1
+    progressPattern = re.compile(r'^out_time_(?:us|ms)=(\d+)$')
+
+    def __init__(self, ffmpeg: str, source: str, duration: float, branches: List[Munch],
+                 workers: Optional[int]=None, inputargs: str='', prefilter: str='',
+                 overlap: float=0, priority: int=0, parent=None):
+        super(AnalysisJob, self).__init__(parent)
+        self.ffmpeg = ffmpeg
+        self.source = source
+        self.duration = duration
+        # every branch runs over the same decode, video filters are chained after the shared prefilter since
+        # the analysis filters pass frames through unchanged
+        self.branches = branches
+        self.inputargs = inputargs
+        self.prefilter = prefilter
+        # filters comparing neighbouring frames start decoding this much ahead of their chunk, results found
+        # in that lead-in belong to the previous chunk and are dropped
+        self.overlap = overlap
+        self.priority = priority
+        self.workers = workers if workers is not None else max(QThread.idealThreadCount(), 1)
+        self.logger = logging.getLogger(__name__)
+        self.chunks = []
+        self.cancelled = False
+
+    @staticmethod
+    def branch(name: str, filters: str, start: str, end: str, media: str='v', value: Optional[str]=None) -> Munch:
+        # one analysis filter of a job: its filter chain on the first video or audio stream plus the log patterns
+        # giving interval start/end times and, optionally, a value (e.g. a score) reported along with the end
+        return Munch(name=name, filters=filters, media=media, start=re.compile(start), end=re.compile(end),
+                     value=re.compile(value) if value else None)
+
+    def split(self) -> List[Munch]:
+        # chunks are split on time, no keyframe index is needed up front. the input seek of each worker starts
+        # decoding at the keyframe before its chunk and drops the frames ahead of it before they reach the filters
+        count = max(min(self.workers, int(self.duration / self.minChunkLength)), 1)
+        borders = [self.duration * index / count for index in range(count)] + [self.duration]
+        return [Munch(start=borders[index], end=borders[index + 1], lead=min(self.overlap, borders[index]), proc=None,
+                      buffer='', opened={branch.name: None for branch in self.branches},
+                      intervals={branch.name: [] for branch in self.branches}, position=0.0, started=False,
+                      done=False)
+                for index in range(len(borders) - 1)]
+
+    def start(self, scheduler: Optional['AnalysisScheduler']=None) -> None:
+        # chunk processes are launched by the scheduler as workers free up, or all at once without one
+        self.chunks = self.split()
+        self.logger.info('analysing {0} in {1} chunk(s): {2}'.format(os.path.basename(self.source), len(self.chunks),
+                                                                    ', '.join(b.name for b in self.branches)))
+        for chunk in self.chunks:
+            chunk.proc = QProcess(self)
+            chunk.proc.setProcessChannelMode(QProcess.MergedChannels)
+            chunk.proc.setWorkingDirectory(os.path.dirname(self.source))
+            chunk.proc.readyReadStandardOutput.connect(lambda c=chunk: self.chunkOutput(c))
+            chunk.proc.finished.connect(lambda code, status, c=chunk: self.chunkFinished(c, code, status))
+        if scheduler is not None:
+            scheduler.submit(self)
+        else:
+            [self.launch(chunk) for chunk in self.chunks]
+
+    def launch(self, chunk: Munch, nice: int=0, ionice: Optional[int]=None) -> None:
+        program, args = self.ffmpeg, shlex.split(self.arguments(chunk))
+        if os.name == 'posix':
+            # lower cpu + disk priority so playback and thumbnailing stay responsive while analysing
+            if ionice is not None and shutil.which('ionice') is not None:
+                program, args = 'ionice', ['-c', '2', '-n', str(ionice), program] + args
+            if nice > 0 and shutil.which('nice') is not None:
+                program, args = 'nice', ['-n', str(nice), program] + args
+        chunk.started = True
+        chunk.proc.start(program, args)
+
+    def arguments(self, chunk: Munch) -> str:
+        video = [branch.filters for branch in self.branches if branch.media == 'v']
+        audio = [branch.filters for branch in self.branches if branch.media == 'a']
+        streams = '-map 0:v:0 -vf "{}"'.format(self.prefilter + ','.join(video)) if len(video) else '-vn'
+        streams += ' -map 0:a:0 -af "{}"'.format(','.join(audio)) if len(audio) else ' -an'
+        inputargs = self.inputargs if len(video) else ''
+        return '-hide_banner -nostats -progress pipe:1 -threads 1 {0} -ss {1:.6f} -t {2:.6f} -i "{3}" {4} -sn ' \
+               '-f null -'.format(inputargs, chunk.start - chunk.lead, chunk.end - chunk.start + chunk.lead,
+                                  self.source, streams)
+
+    def parse(self, chunk: Munch, lines: List[str]) -> None:
+        # filter times are relative to where decoding of the chunk started, chunk.opened is relative to its start
+        for line in lines:
+            match = self.progressPattern.match(line.strip())
+            if match is not None:
+                chunk.position = min(max(int(match.group(1)) / 1000000 - chunk.lead, 0), chunk.end - chunk.start)
+                continue
+            for branch in self.branches:
+                match = branch.start.search(line)
+                if match is not None and chunk.opened[branch.name] is None:
+                    chunk.opened[branch.name] = max(float(match.group(1)) - chunk.lead, 0)
+                match = branch.end.search(line)
+                if match is not None and chunk.opened[branch.name] is not None:
+                    end = float(match.group(1)) - chunk.lead
+                    if end >= 0:
+                        interval = [chunk.start + chunk.opened[branch.name], chunk.start + end]
+                        if branch.value is not None:
+                            value = branch.value.search(line)
+                            interval.append(float(value.group(1)) if value is not None else 0.0)
+                        chunk.intervals[branch.name].append(interval)
+                        chunk.position = max(chunk.position, end)
+                    chunk.opened[branch.name] = None
+
+    def chunkOutput(self, chunk: Munch) -> None:
+        if self.cancelled:
+            return
+        lines = (chunk.buffer + chunk.proc.readAllStandardOutput().data().decode(errors='replace')).split('\n')
+        chunk.buffer = lines.pop()
+        self.parse(chunk, lines)
+        self.updated.emit(self.progress, self.frontier)
+
+    def chunkFinished(self, chunk: Munch, code: int, status: QProcess.ExitStatus) -> None:
+        self.collect(chunk, code, status)
+        self.released.emit()
+
+    def collect(self, chunk: Munch, code: int, status: QProcess.ExitStatus) -> None:
+        if self.cancelled:
+            return
+        self.chunkOutput(chunk)
+        if status != QProcess.NormalExit or code != 0:
+            self.cancel()
+            self.logger.error('analysis chunk failed: {0} {1}\n{2}'.format(self.ffmpeg, self.arguments(chunk),
+                                                                          chunk.buffer))
+            self.failed.emit('Could not analyze media file {}'.format(os.path.basename(self.source)))
+            return
+        self.parse(chunk, [chunk.buffer])
+        chunk.buffer = ''
+        for name, opened in chunk.opened.items():
+            if opened is not None:
+                # an interval still open at the end of the chunk runs up to its border
+                chunk.intervals[name].append([chunk.start + opened, chunk.end])
+                chunk.opened[name] = None
+        chunk.position, chunk.done = chunk.end - chunk.start, True
+        if False not in [c.done for c in self.chunks]:
+            self.completed.emit({branch.name: self.merge(branch.name) for branch in self.branches})
+        else:
+            self.updated.emit(self.progress, self.frontier)
+
+    @property
+    def progress(self) -> float:
+        return sum(chunk.position for chunk in self.chunks) / max(self.duration, 0.001)
+
+    @property
+    def frontier(self) -> float:
+        # everything before this time has been analysed, only later results can still change
+        for chunk in self.chunks:
+            if not chunk.done:
+                opened = [value for value in chunk.opened.values() if value is not None]
+                return chunk.start + min(opened + [chunk.position])
+        return self.duration
+
+    def merge(self, name: str) -> List[list]:
+        return mergeIntervals([i for chunk in self.chunks for i in chunk.intervals[name]],
+                              [chunk.end for chunk in self.chunks[:-1]], self.borderTolerance)
+
+    def settled(self, name: str, since: float=0) -> List[list]:
+        # merged intervals ending after since that can no longer grow, i.e. those ending clear of the analysis
+        # frontier. only the chunks between since and the frontier are merged so polling while streaming stays cheap
+        frontier = self.frontier
+        chunks = [chunk for chunk in self.chunks if chunk.end >= since and chunk.start <= frontier]
+        merged = mergeIntervals([i for chunk in chunks for i in chunk.intervals[name] if i[1] > since],
+                                [chunk.end for chunk in chunks[:-1]], self.borderTolerance)
+        return [interval for interval in merged if interval[1] < frontier - self.borderTolerance]
+
+    def counts(self) -> Dict[str, int]:
+        return {name: len(self.merge(name)) for name in self.chunks[0].intervals} if len(self.chunks) else {}
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        for chunk in self.chunks:
+            if chunk.proc is not None and chunk.proc.state() != QProcess.NotRunning:
+                chunk.proc.kill()
+
+    @property
+    def active(self) -> int:
+        return len([c for c in self.chunks if c.proc is not None and c.proc.state() != QProcess.NotRunning])
+
+    @property
+    def queued(self) -> List[Munch]:
+        return [c for c in self.chunks if not c.started] if not self.cancelled else []
+
+    @property
+    def running(self) -> bool:
+        return not self.cancelled and (self.active > 0 or len(self.queued) > 0)
+
+
+class AnalysisScheduler(QObject):
+    Interactive, Background = 0, 1
+    # nice + ionice levels per priority, background analysis yields to everything else
+    levels = {Interactive: (5, 4), Background: (15, 7)}
+
+    def __init__(self, workers: Optional[int]=None, parent=None):
+        super(AnalysisScheduler, self).__init__(parent)
+        # one core is left to the player
+        self.workers = workers if workers is not None else max(QThread.idealThreadCount() - 1, 1)
+        self.jobs = []
+
+    def submit(self, job: AnalysisJob) -> None:
+        job.released.connect(self.pump)
+        self.jobs.append(job)
+        self.pump()
+
+    @pyqtSlot()
+    def pump(self) -> None:
+        # queued chunks of higher priority jobs go first, jobs of equal priority in the order they came in
+        self.jobs = [job for job in self.jobs if job.running]
+        running = sum(job.active for job in self.jobs)
+        for job in sorted(self.jobs, key=lambda j: j.priority):
+            nice, ionice = self.levels.get(job.priority, self.levels[self.Background])
+            for chunk in job.queued:
+                if running >= self.workers:
+                    return
+                job.launch(chunk, nice, ionice)
+                running += 1
+
+    def cancel(self, job: Optional[AnalysisJob]) -> None:
+        if job is not None:
+            job.cancel()
+        self.pump()
+
+    def cancelAll(self) -> None:
+        for job in self.jobs:
+            job.cancel()
+        self.jobs.clear()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import hashlib
+import logging
+import os
+import time
+from typing import List, Optional
+
+from PyQt5.QtCore import QStandardPaths
+
+try:
+    # noinspection PyPackageRequirements
+    from simplejson import dump, load, JSONDecodeError
+except ImportError:
+    from json import dump, load, JSONDecodeError
+
+
+class AnalysisCache:
+    maxEntries = 500
+
+    def __init__(self, folder: Optional[str]=None):
+        if folder is None:
+            folder = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'analysis')
+        self.folder = folder
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def key(source: str, args: List[str]) -> str:
+        # the media fingerprint plus everything shaping the raw filter output, i.e. the filter chain, stream
+        # type + decode options. thresholds applied afterwards are not part of it
+        fileinfo = os.stat(source)
+        data = repr(([os.path.normcase(os.path.abspath(source)), fileinfo.st_size, fileinfo.st_mtime], args))
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.folder, '{}.json'.format(key))
+
+    def fetch(self, key: str) -> Optional[List[list]]:
+        try:
+            with open(self.path(key), 'r') as f:
+                intervals = load(f)['intervals']
+            os.utime(self.path(key))
+            self.logger.info('analysis cache hit: {}'.format(key))
+            return intervals
+        except (OSError, KeyError, ValueError, JSONDecodeError):
+            return None
+
+    def store(self, key: str, source: str, args: List[str], intervals: List[list]) -> None:
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(self.path(key), 'w') as f:
+                dump({'source': source, 'args': args, 'created': time.time(), 'intervals': intervals}, f)
+            self.evict()
+        except OSError:
+            self.logger.exception('could not write analysis cache entry {}'.format(key), exc_info=True)
+
+    def evict(self) -> None:
+        # entries are tiny, the least recently used ones are dropped once there are too many
+        entries = [os.path.join(self.folder, name) for name in os.listdir(self.folder) if name.endswith('.json')]
+        if len(entries) <= self.maxEntries:
+            return
+        for entry in sorted(entries, key=os.path.getmtime)[:len(entries) - self.maxEntries]:
+            os.remove(entry)
+
+    def clear(self) -> None:
+        if os.path.isdir(self.folder):
+            for name in os.listdir(self.folder):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.folder, name))
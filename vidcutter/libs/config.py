@@ -35,7 +35,50 @@ class Config:
         return Munch(
             blackdetect=Munch(
                 min_duration=0.1,
-                default_duration=2.0
+                default_duration=2.0,
+                picture_threshold=0.98,
+                pixel_threshold=0.10
+            ),
+            scenedetect=Munch(
+                min_threshold=1.0,
+                max_threshold=100.0,
+                default_threshold=10.0,
+                min_scene=1.0,
+                overlap=1.0
+            ),
+            silencedetect=Munch(
+                min_duration=0.1,
+                default_duration=1.5,
+                min_noise=-90.0,
+                max_noise=0.0,
+                default_noise=-40.0,
+                # shortest silence reported by the filter, longer minimums are applied after chunks are merged
+                detect_duration=0.05
+            ),
+            freezedetect=Munch(
+                min_duration=0.5,
+                default_duration=5.0,
+                min_noise=-90.0,
+                max_noise=0.0,
+                default_noise=-60.0,
+                detect_duration=0.5
+            ),
+            # fast analysis decodes to a tiny luma plane, lowres is only honoured by a few decoders
+            decode=Munch(
+                fast=Munch(
+                    args='-skip_frame nonref -skip_loop_filter all -flags2 +fast',
+                    lowres=2,
+                    lowres_codecs=['h263', 'mjpeg', 'mpeg1video', 'mpeg2video', 'mpeg4'],
+                    width=160,
+                    pix_fmt='gray'
+                ),
+                full=Munch(
+                    args='',
+                    lowres=0,
+                    lowres_codecs=[],
+                    width=0,
+                    pix_fmt=None
+                )
             )
         )
 
@@ -65,12 +108,66 @@ class Config:
             'aac'
         ]
 
+    @property
+    def faststart_formats(self) -> list:
+        return ['.3g2', '.3gp', '.m4a', '.m4v', '.mov', '.mp4', '.qt']
+
     @property
     def encoding(self) -> dict:
         return {
-            'hevc': 'libx265 -tune zerolatency -preset ultrafast -x265-params crf=23 -qp 4 -flags +cgop',
-            'h264': 'libx264 -tune film -preset ultrafast -x264-params crf=23 -qp 0 -flags +cgop',
-            'vp9': 'libvpx-vp9 -deadline best -quality best'
+            'hevc': 'libx265 -preset veryfast -flags +cgop',
+            'h264': 'libx264 -tune film -preset veryfast -flags +cgop',
+            'vp9': 'libvpx-vp9 -deadline good -cpu-used 4 -row-mt 1'
+        }
+
+    @property
+    def audio_encoding(self) -> dict:
+        # boundary audio is only re-encoded for codecs whose re-encoded packets concat cleanly with the copied
+        # middle, i.e. no per-encode extradata. vorbis, opus, flac + alac headers differ per encode so are copied.
+        # codecs listed with profiles are only re-encoded for those profiles, using the matching encoder profile
+        return {
+            'aac': {'encoder': 'aac', 'profiles': {'LC': 'aac_low'}},
+            'mp3': {'encoder': 'libmp3lame'},
+            'mp2': {'encoder': 'mp2'},
+            'ac3': {'encoder': 'ac3'},
+            'eac3': {'encoder': 'eac3'}
+        }
+
+    @property
+    def encoders(self) -> dict:
+        # SmartCut encoder candidates per source codec; presets run fastest to slowest and start at the
+        # quality floor, anything faster than the first preset listed is never considered
+        return {
+            'h264': [
+                {'name': 'libx264', 'options': 'libx264 -tune film -flags +cgop -preset {}',
+                 'presets': ['superfast', 'veryfast', 'faster']},
+                {'name': 'h264_nvenc', 'options': 'h264_nvenc -preset {}', 'presets': ['p2', 'p3', 'p4']},
+                {'name': 'h264_qsv', 'options': 'h264_qsv -preset {}', 'presets': ['veryfast', 'faster']},
+                {'name': 'h264_amf', 'options': 'h264_amf -quality {}', 'presets': ['speed', 'balanced']},
+                {'name': 'h264_videotoolbox', 'options': 'h264_videotoolbox{}', 'presets': ['']}
+            ],
+            'hevc': [
+                {'name': 'libx265', 'options': 'libx265 -flags +cgop -preset {}',
+                 'presets': ['superfast', 'veryfast', 'faster']},
+                {'name': 'hevc_nvenc', 'options': 'hevc_nvenc -preset {}', 'presets': ['p2', 'p3', 'p4']},
+                {'name': 'hevc_qsv', 'options': 'hevc_qsv -preset {}', 'presets': ['veryfast', 'faster']},
+                {'name': 'hevc_amf', 'options': 'hevc_amf -quality {}', 'presets': ['speed', 'balanced']},
+                {'name': 'hevc_videotoolbox', 'options': 'hevc_videotoolbox{}', 'presets': ['']}
+            ],
+            'vp9': [
+                {'name': 'libvpx-vp9', 'options': 'libvpx-vp9 -deadline good -row-mt 1 -cpu-used {}',
+                 'presets': ['5', '4', '3']}
+            ]
+        }
+
+    @property
+    def encoding_profiles(self) -> dict:
+        return {
+            'h264': {
+                'constrained baseline': 'baseline', 'baseline': 'baseline', 'main': 'main', 'high': 'high',
+                'high 10': 'high10', 'high 4:2:2': 'high422', 'high 4:4:4 predictive': 'high444'
+            },
+            'hevc': {'main': 'main', 'main 10': 'main10', 'main still picture': 'mainstillpicture'}
         }
 
     @property
@@ -118,6 +215,10 @@ class Streams(Enum):
 
 class VideoFilter(Enum):
     BLACKDETECT = 1
+    SCENEDETECT = 2
+    SILENCEDETECT = 3
+    ANALYZE = 4
+    FREEZEDETECT = 5
 
 
 class VidCutterException(Exception):
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import logging
+import re
+import shlex
+import time
+from functools import partial
+from typing import Optional
+
+from PyQt5.QtCore import QObject, QProcess, QSettings
+
+from vidcutter.libs.config import Config
+from vidcutter.libs.munch import Munch
+
+
+class EncoderRegistry(QObject):
+    benchmarkLength = 3
+    # an encoder that failed (e.g. no supported hardware) is tried again after this many secs, drivers get updated
+    failureExpiry = 7 * 24 * 60 * 60
+
+    def __init__(self, ffmpeg: str, settings: QSettings, parent: QObject=None):
+        super(EncoderRegistry, self).__init__(parent)
+        self.ffmpeg = ffmpeg
+        self.settings = settings
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self._available = None
+        self.pending = []
+        self.proc = None
+
+    @property
+    def available(self) -> set:
+        if self._available is None:
+            self._available = set()
+            proc = QProcess()
+            proc.setProcessChannelMode(QProcess.MergedChannels)
+            proc.start(self.ffmpeg, ['-hide_banner', '-encoders'])
+            proc.waitForFinished(-1)
+            for line in proc.readAllStandardOutput().data().decode().split('\n'):
+                match = re.match(r'^\s*V\S{5}\s+(\S+)', line)
+                if match:
+                    self._available.add(match.group(1))
+        return self._available
+
+    def candidates(self, codec: str) -> list:
+        return [candidate for candidate in self.config.encoders.get(codec, [])
+                if candidate['name'] in self.available]
+
+    @staticmethod
+    def key(candidate: dict, preset: str, stream: Munch) -> str:
+        # results are cached per resolution
+        return '{0}_{1}_{2}x{3}'.format(candidate['name'], preset or 'default', stream.width, stream.height)
+
+    def result(self, candidate: dict, preset: str, stream: Munch) -> Optional[float]:
+        # the measured fps, -1 for an encoder that recently failed or None when it still needs benchmarking
+        key = EncoderRegistry.key(candidate, preset, stream)
+        failed = self.settings.value('encoderFailures/{}'.format(key), None)
+        if failed is not None and time.time() - float(failed) < self.failureExpiry:
+            return -1
+        cached = self.settings.value('encoderBenchmarks/{}'.format(key), None)
+        return float(cached) if cached is not None else None
+
+    def prepare(self, codec: str, source: str, stream: Munch) -> None:
+        # benchmarks run one at a time in the background, an export only ever uses results already measured
+        self.pending = [(candidate, preset, source, stream) for candidate in self.candidates(codec)
+                        for preset in candidate['presets'] if self.result(candidate, preset, stream) is None]
+        if self.proc is None:
+            self.benchmark()
+
+    def benchmark(self) -> None:
+        if not len(self.pending):
+            return
+        candidate, preset, source, stream = self.pending.pop(0)
+        # encode a few seconds of the source at its own resolution
+        args = '-hide_banner -v error -i "{0}" -t {1} -map 0:v:0 -an -sn -pix_fmt {2} -c:v {3} -f null -' \
+               .format(source, self.benchmarkLength, stream.get('pix_fmt', 'yuv420p'),
+                       candidate['options'].format(preset))
+        self.proc = QProcess(self)
+        self.proc.setProcessChannelMode(QProcess.MergedChannels)
+        self.proc.finished.connect(partial(self.benchmarked, self.proc, candidate, preset, stream,
+                                           time.perf_counter()))
+        self.proc.start(self.ffmpeg, shlex.split(args))
+
+    def benchmarked(self, proc: QProcess, candidate: dict, preset: str, stream: Munch, started: float, code: int,
+                    status: QProcess.ExitStatus) -> None:
+        elapsed = max(time.perf_counter() - started, 0.001)
+        key = EncoderRegistry.key(candidate, preset, stream)
+        if status == QProcess.NormalExit and code == 0:
+            fps = (self.benchmarkLength * eval_rate(stream.get('avg_frame_rate', '25/1'))) / elapsed
+            self.settings.setValue('encoderBenchmarks/{}'.format(key), fps)
+            self.settings.remove('encoderFailures/{}'.format(key))
+        else:
+            fps = -1
+            self.settings.setValue('encoderFailures/{}'.format(key), time.time())
+        self.logger.info('encoder benchmark {0} [{1}]: {2:.1f} fps'.format(candidate['name'], preset, fps))
+        proc.deleteLater()
+        self.proc = None
+        self.benchmark()
+
+    def select(self, codec: str, stream: Munch) -> Optional[Munch]:
+        # never waits on a benchmark, encoders not measured yet for this resolution are simply left out
+        best = None
+        for candidate in self.candidates(codec):
+            for preset in candidate['presets']:
+                fps = self.result(candidate, preset, stream)
+                if fps is not None and fps > 0 and (best is None or fps > best.fps):
+                    best = Munch(name=candidate['name'], options=candidate['options'].format(preset), fps=fps)
+        if best is not None:
+            self.logger.info('SmartCut encoder selected: {0} ({1:.1f} fps)'.format(best.options, best.fps))
+        return best
+
+
+def eval_rate(rate: str) -> float:
+    try:
+        num, den = rate.split('/')
+        return float(num) / float(den) if float(den) else 25.0
+    except ValueError:
+        return 25.0
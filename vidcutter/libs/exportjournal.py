@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import hashlib
+import logging
+import os
+from typing import List, Optional
+
+from vidcutter.libs.munch import Munch
+
+try:
+    # noinspection PyPackageRequirements
+    from simplejson import dump, load, JSONDecodeError
+except ImportError:
+    from json import dump, load, JSONDecodeError
+
+
+class ExportJournal:
+    sampleSize = 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self.job = None
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def pending(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> Optional[Munch]:
+        try:
+            with open(self.path, 'r') as f:
+                self.job = Munch.fromDict(load(f))
+            return self.job
+        except (OSError, ValueError, JSONDecodeError):
+            self.logger.exception('could not read export journal {}'.format(self.path), exc_info=True)
+            self.discard()
+            return None
+
+    def save(self) -> None:
+        # written to a temporary file first so a crash never leaves a half written journal behind
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open('{}.tmp'.format(self.path), 'w') as f:
+                dump(self.job.toDict(), f)
+            os.replace('{}.tmp'.format(self.path), self.path)
+        except OSError:
+            self.logger.exception('could not write export journal {}'.format(self.path), exc_info=True)
+
+    def start(self, media: Optional[str], clips: List[list], output: str, plan: Munch) -> None:
+        if self.job is not None and self.job.output == output and self.job.clips == clips \
+                and self.job.mode == plan.mode:
+            # resuming the journalled export so its completed outputs stay valid
+            self.job.steps = [step.toDict() for step in plan.steps]
+            self.save()
+            return
+        self.job = Munch(media=media, clips=clips, output=output, mode=plan.mode, workfolder=plan.workfolder,
+                         steps=[step.toDict() for step in plan.steps], completed={}, joined=False)
+        self.save()
+
+    def complete(self, index: int, filename: str) -> None:
+        if self.job is None or not os.path.isfile(filename):
+            return
+        self.job.completed[str(index)] = Munch(file=filename, size=os.path.getsize(filename),
+                                               checksum=ExportJournal.checksum(filename))
+        self.save()
+
+    def completed(self, index: int) -> Optional[str]:
+        if self.job is None or str(index) not in self.job.completed:
+            return None
+        entry = self.job.completed[str(index)]
+        if not os.path.isfile(entry.file) or os.path.getsize(entry.file) != entry.size \
+                or ExportJournal.checksum(entry.file) != entry.checksum:
+            self.logger.info('journalled output no longer matches, cutting again: {}'.format(entry.file))
+            return None
+        return entry.file
+
+    def join(self) -> None:
+        if self.job is not None:
+            self.job.joined = True
+            self.save()
+
+    def finish(self) -> None:
+        self.job = None
+        self.discard()
+
+    def discard(self) -> None:
+        for path in (self.path, '{}.tmp'.format(self.path)):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    @staticmethod
+    def checksum(filename: str) -> str:
+        # samples the start, middle and end of the file which is enough to catch truncated or replaced outputs
+        size = os.path.getsize(filename)
+        digest = hashlib.sha1(str(size).encode())
+        with open(filename, 'rb') as f:
+            for offset in sorted({0, max(int(size / 2) - int(ExportJournal.sampleSize / 2), 0),
+                                  max(size - ExportJournal.sampleSize, 0)}):
+                f.seek(offset)
+                digest.update(f.read(ExportJournal.sampleSize))
+        return digest.hexdigest()
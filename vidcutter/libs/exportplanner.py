@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import logging
+import os
+from typing import List
+
+from PyQt5.QtCore import QSettings, QStorageInfo
+
+from vidcutter.libs.munch import Munch
+from vidcutter.libs.scratchspace import ScratchSpace
+
+
+class ExportPlanner:
+    # fallback write throughput in bytes/sec used until real exports have been measured
+    defaultThroughput = {'copy': 100 * 1000 * 1000, 'smartcut': 15 * 1000 * 1000}
+    spaceMargin = 50 * 1000 * 1000
+
+    def __init__(self, service, settings: QSettings, scratch: ScratchSpace):
+        self.service = service
+        self.settings = settings
+        self.scratch = scratch
+        self.logger = logging.getLogger(__name__)
+
+    def bitrate(self, source: str) -> float:
+        media = self.service.probe(source)
+        if 'bit_rate' in media.format:
+            return float(media.format.bit_rate)
+        return float(media.format.size) * 8 / float(media.format.duration)
+
+    def throughput(self, mode: str) -> float:
+        return self.settings.value('exportThroughput/{}'.format(mode), self.defaultThroughput[mode], type=float)
+
+    def recordThroughput(self, mode: str, written: float, secs: float) -> None:
+        if written <= 0 or secs <= 0:
+            return
+        measured = written / secs
+        previous = self.settings.value('exportThroughput/{}'.format(mode), 0, type=float)
+        # smooth over past exports so one odd run does not skew future estimates too much
+        current = measured if not previous else (previous * 0.7) + (measured * 0.3)
+        self.settings.setValue('exportThroughput/{}'.format(mode), current)
+
+    def plan(self, clips: List[Munch], output: str, ext: str, smartcut: bool, keepclips: bool=False) -> Munch:
+        plan = Munch(output=output, workfolder=None, mode='smartcut' if smartcut else 'copy', steps=[],
+                     outputs=[], direct=False, outputsize=0, tempsize=0, written=0, runtime=0, error=None,
+                     notes=[])
+        sizes = [self.bitrate(clip.source) / 8 * (clip.end - clip.start) for clip in clips]
+        plan.outputsize = sum(sizes)
+        workclips = [index for index, clip in enumerate(clips) if not clip.external or clip.trimmed]
+        if len(clips) == 1 and len(workclips) and not smartcut:
+            # a single clip is cut straight to its final destination, no work file is needed
+            plan.direct = True
+        elif smartcut:
+            # all clips are processed concurrently and each clip's segments exist alongside its joined file
+            plan.tempsize = sum(sizes[index] * 2 for index in workclips)
+        else:
+            plan.tempsize = sum(sizes[index] for index in workclips)
+        outputfolder = os.path.dirname(output)
+        if keepclips or plan.direct:
+            plan.workfolder = outputfolder
+        else:
+            plan.workfolder = self.scratch.select(plan.tempsize, [outputfolder])
+        plan.written = plan.tempsize + plan.outputsize
+        plan.runtime = plan.written / self.throughput(plan.mode)
+        self.checkSpace(plan)
+        # steps are laid out once the work folder is settled so they carry the same file names the export writes
+        file, _ = os.path.splitext(output)
+        for index, clip in enumerate(clips):
+            if clip.external and not clip.trimmed:
+                plan.steps.append(Munch(command='reuse', inputs=[clip.source], output=clip.source, size=0))
+                plan.outputs.append(clip.source)
+                continue
+            if plan.direct:
+                clipfile = output
+            else:
+                clipfile = '{0}_{1:0>2}{2}'.format(file, index, ext)
+                if not keepclips:
+                    clipfile = os.path.join(plan.workfolder, os.path.basename(clipfile))
+            if smartcut:
+                plan.steps.extend(self.smartSteps(index, clip, clipfile, sizes[index]))
+            else:
+                plan.steps.append(Munch(command='copy', inputs=[clip.source], output=clipfile, size=sizes[index]))
+            plan.outputs.append(clipfile)
+        if len(plan.outputs) > 1:
+            plan.steps.append(Munch(command='join', inputs=list(plan.outputs), output=output,
+                                    size=plan.outputsize))
+        self.logger.info(self.summary(plan))
+        return plan
+
+    def smartSteps(self, index: int, clip: Munch, clipfile: str, size: float) -> List[Munch]:
+        # mirrors VideoService.smartcut, start + end are only re-encoded when the clip is not on a keyframe there
+        clipbase, clipext = os.path.splitext(clipfile)
+        bisections = self.service.getGOPbisections(clip.source, clip.start, clip.end)
+        steps = []
+        for name, command, needed in (('start', 'encode', bisections['start'][1] > bisections['start'][0]),
+                                      ('middle', 'copy', True),
+                                      ('end', 'encode', bisections['end'][2] > bisections['end'][1])):
+            if needed:
+                steps.append(Munch(command=command, inputs=[clip.source], size=size,
+                                   output='{0}_{1}_{2:0>2}{3}'.format(clipbase, name, index, clipext)))
+        steps.append(Munch(command='join', inputs=[step.output for step in steps], output=clipfile, size=size))
+        return steps
+
+    def checkSpace(self, plan: Munch) -> None:
+        outputfolder = os.path.dirname(plan.output)
+        workvolume, outputvolume = QStorageInfo(plan.workfolder), QStorageInfo(outputfolder)
+        needed = plan.outputsize + self.spaceMargin
+        if workvolume.rootPath() == outputvolume.rootPath():
+            needed += plan.tempsize
+            if outputvolume.bytesAvailable() < needed:
+                plan.error = self.spaceError(outputfolder, needed, outputvolume.bytesAvailable())
+            return
+        if outputvolume.bytesAvailable() < needed:
+            plan.error = self.spaceError(outputfolder, needed, outputvolume.bytesAvailable())
+        elif workvolume.bytesAvailable() < plan.tempsize + self.spaceMargin:
+            # work folder volume is short on space so fall back to keeping work files beside the output
+            if outputvolume.bytesAvailable() >= needed + plan.tempsize:
+                plan.notes.append('work files moved from {0} to {1}'.format(plan.workfolder, outputfolder))
+                plan.workfolder = outputfolder
+            else:
+                plan.error = self.spaceError(plan.workfolder, plan.tempsize + self.spaceMargin,
+                                             workvolume.bytesAvailable())
+
+    @staticmethod
+    def spaceError(folder: str, needed: float, available: float) -> str:
+        return '<p>There is not enough free disk space to save your media.</p>' \
+               '<p>About <b>{0:.0f} MB</b> is needed in <b>{1}</b> but only <b>{2:.0f} MB</b> is available. ' \
+               'Free up some space or choose another location and try again.</p>' \
+               .format(needed / 1000 / 1000, folder, available / 1000 / 1000)
+
+    @staticmethod
+    def summary(plan: Munch) -> str:
+        counts = {}
+        for step in plan.steps:
+            counts[step.command] = counts.get(step.command, 0) + 1
+        return 'export plan ({0}): {1} | output ~{2:.0f} MB, work files ~{3:.0f} MB in {4}, ~{5:.0f} secs{6}' \
+               .format(plan.mode, ', '.join('{0} x {1}'.format(count, command) for command, count in counts.items()),
+                       plan.outputsize / 1000 / 1000, plan.tempsize / 1000 / 1000, plan.workfolder, plan.runtime,
+                       ' | {}'.format('; '.join(plan.notes)) if len(plan.notes) else '')
+
+    @staticmethod
+    def preview(plan: Munch) -> str:
+        encodes = len([step for step in plan.steps if step.command == 'encode'])
+        return '<p>Your media will be saved to <b>{0}</b>.</p>' \
+               '<p>Estimated file size: <b>{1:.0f} MB</b><br/>' \
+               'Work space needed: <b>{2:.0f} MB</b>{3}<br/>' \
+               'Estimated time: <b>{4}</b></p>{5}{6}' \
+               .format(os.path.basename(plan.output), plan.outputsize / 1000 / 1000, plan.tempsize / 1000 / 1000,
+                       ' in <b>{}</b>'.format(plan.workfolder) if plan.tempsize else '',
+                       ExportPlanner.duration(plan.runtime),
+                       '<p>{} clip boundaries will be re-encoded.</p>'.format(encodes) if encodes else '',
+                       ''.join('<p>{}</p>'.format(note) for note in plan.notes))
+
+    @staticmethod
+    def duration(secs: float) -> str:
+        if secs < 60:
+            return '{} secs'.format(max(1, round(secs)))
+        return '{0:.0f} mins {1:.0f} secs'.format(secs // 60, secs % 60)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+
+from typing import List, Optional, Tuple
+
+try:
+    # noinspection PyPackageRequirements
+    import numpy
+except ImportError:
+    numpy = None
+
+# interval math on detection results, [start, end] or [start, end, value] lists of seconds. numpy is used when
+# installed, frozen builds leave it out and fall back to plain python
+
+
+def mergeIntervals(intervals: List[list], borders: List[float], tolerance: float) -> List[list]:
+    # joins intervals that meet at one of the borders, values are taken from the first interval of a run
+    if not len(intervals):
+        return []
+    intervals = sorted(intervals)
+    if numpy is None or not len(borders):
+        merged = []
+        for interval in intervals:
+            if len(merged) and True in [abs(merged[-1][1] - border) <= tolerance
+                                        and abs(interval[0] - border) <= tolerance for border in borders]:
+                merged[-1][1] = max(merged[-1][1], interval[1])
+            else:
+                merged.append(list(interval))
+        return merged
+    starts = numpy.array([interval[0] for interval in intervals])
+    ends = numpy.array([interval[1] for interval in intervals])
+    edges = numpy.array(borders)
+    joined = ((numpy.abs(ends[:-1, None] - edges[None, :]) <= tolerance)
+              & (numpy.abs(starts[1:, None] - edges[None, :]) <= tolerance)).any(axis=1)
+    first = numpy.flatnonzero(numpy.concatenate(([True], ~joined)))
+    groupends = numpy.maximum.reduceat(ends, first)
+    return [[float(starts[index]), float(end)] + list(intervals[index][2:]) for index, end in zip(first, groupends)]
+
+
+def selectIntervals(intervals: List[list], min_length: float=0, min_value: Optional[float]=None) -> List[list]:
+    if not len(intervals):
+        return []
+    if numpy is None:
+        return [interval for interval in intervals if interval[1] - interval[0] >= min_length
+                and (min_value is None or interval[2] >= min_value)]
+    data = numpy.array([interval[:3] if min_value is not None else interval[:2] for interval in intervals])
+    mask = (data[:, 1] - data[:, 0]) >= min_length
+    if min_value is not None:
+        mask &= data[:, 2] >= min_value
+    return [intervals[index] for index in numpy.flatnonzero(mask)]
+
+
+def complementIntervals(intervals: List[list], last: float=0, min_gap: float=0) -> Tuple[List[list], float]:
+    # the ranges between intervals starting at last, intervals closer than min_gap to the previous one kept are
+    # skipped. returns the ranges plus the furthest end of the intervals kept, so overlapping input is covered
+    if not len(intervals):
+        return [], last
+    if numpy is None:
+        ranges = []
+        for interval in intervals:
+            if last < interval[0]:
+                if interval[0] < last + min_gap:
+                    continue
+                ranges.append([last, interval[0]])
+            # an interval overlapping the ones before only extends them
+            last = max(last, interval[1])
+        return ranges, last
+    starts = numpy.array([interval[0] for interval in intervals])
+    if min_gap <= 0:
+        ends = numpy.maximum.accumulate(numpy.concatenate(([last], [interval[1] for interval in intervals])))
+        mask = ends[:-1] < starts
+        return numpy.stack((ends[:-1][mask], starts[mask]), axis=1).tolist(), float(ends[-1])
+    # the gap rule depends on the intervals kept before so it cannot be applied all at once. starts are sorted
+    # though, so each step jumps over a whole block: the intervals overlapping what is covered so far or the
+    # ones starting within min_gap of it
+    ends = numpy.array([interval[1] for interval in intervals])
+    ranges, pos = [], 0
+    while pos < len(starts):
+        stop = int(numpy.searchsorted(starts, last, side='right'))
+        if stop > pos:
+            last, pos = max(last, float(ends[pos:stop].max())), stop
+            continue
+        pos = max(pos, int(numpy.searchsorted(starts, last + min_gap, side='left')))
+        if pos == len(starts):
+            break
+        ranges.append([last, float(starts[pos])])
+        last, pos = max(last, float(ends[pos])), pos + 1
+    return ranges, last
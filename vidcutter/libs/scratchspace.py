@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import hashlib
+import logging
+import os
+import time
+from typing import List
+
+from PyQt5.QtCore import pyqtSignal, pyqtSlot, QObject, QSettings, QStorageInfo, Qt, QThread
+
+
+class ScratchProbe(QObject):
+    completed = pyqtSignal(dict)
+
+    probeSize = 32 * 1024 * 1024
+    probeChunk = 4 * 1024 * 1024
+
+    def __init__(self, folders: List[str]):
+        super(ScratchProbe, self).__init__()
+        self.folders = folders
+        self.logger = logging.getLogger(__name__)
+
+    @pyqtSlot()
+    def run(self) -> None:
+        # each folder gets a synced write of probeSize bytes, throughput is returned in bytes/sec per folder and
+        # as -1 for a folder that could not be written to
+        results = {}
+        chunk = os.urandom(self.probeChunk)
+        for folder in self.folders:
+            probefile = os.path.join(folder, '.vidcutter-probe')
+            try:
+                os.makedirs(folder, exist_ok=True)
+                started = time.perf_counter()
+                with open(probefile, 'wb') as f:
+                    for _ in range(int(self.probeSize / self.probeChunk)):
+                        f.write(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+                results[folder] = self.probeSize / max(time.perf_counter() - started, 0.001)
+            except OSError:
+                self.logger.exception('scratch space write probe failed for {}'.format(folder), exc_info=True)
+                results[folder] = -1
+            finally:
+                if os.path.isfile(probefile):
+                    os.remove(probefile)
+        self.completed.emit(results)
+
+
+class ScratchSpace(QObject):
+    spaceMargin = 50 * 1000 * 1000
+    # mounted volumes of these types are never used for work files, network shares, pseudo/read-only filesystems
+    # and memory backed ones that would lose the work files of an interrupted export on reboot
+    skipFilesystems = {b'nfs', b'nfs4', b'cifs', b'smbfs', b'smb3', b'fuse.sshfs', b'sshfs', b'davfs', b'squashfs',
+                       b'iso9660', b'udf', b'proc', b'sysfs', b'devtmpfs', b'devpts', b'cgroup', b'cgroup2',
+                       b'overlay', b'autofs', b'efivarfs', b'tmpfs', b'ramfs'}
+
+    def __init__(self, settings: QSettings, workfolder: str, parent: QObject=None):
+        super(ScratchSpace, self).__init__(parent)
+        self.settings = settings
+        self.workfolder = workfolder
+        self.logger = logging.getLogger(__name__)
+        self.probeThread = None
+
+    def volumes(self) -> List[str]:
+        # writable local volumes get a scratch folder at their root, it is only created once a volume is used
+        folders = []
+        for storage in QStorageInfo.mountedVolumes():
+            if not storage.isValid() or not storage.isReady() or storage.isReadOnly() \
+                    or bytes(storage.fileSystemType()) in self.skipFilesystems \
+                    or not os.access(storage.rootPath(), os.W_OK):
+                continue
+            folders.append(os.path.join(storage.rootPath(), '.vidcutter', 'scratch'))
+        return folders
+
+    def candidates(self, extra: List[str]=None) -> List[str]:
+        folders = [self.workfolder]
+        folders += [os.path.join(folder, 'vidcutter')
+                    for folder in self.settings.value('scratchFolders', [], type=list) if os.path.isdir(folder)]
+        folders += extra if extra is not None else []
+        for folder in folders:
+            try:
+                os.makedirs(folder, exist_ok=True)
+            except OSError:
+                continue
+        # only one folder per volume is needed since throughput + free space are measured per volume
+        volumes, results = set(), []
+        for folder in folders + self.volumes():
+            storage = ScratchSpace.storage(folder)
+            if not storage.isValid() or not storage.isReady() or storage.isReadOnly():
+                continue
+            if storage.rootPath() not in volumes:
+                volumes.add(storage.rootPath())
+                results.append(folder)
+        return results
+
+    @staticmethod
+    def storage(folder: str) -> QStorageInfo:
+        # volume scratch folders are not created until used, so look at the nearest folder that exists
+        while not os.path.isdir(folder) and os.path.dirname(folder) != folder:
+            folder = os.path.dirname(folder)
+        return QStorageInfo(folder)
+
+    @staticmethod
+    def volumeKey(folder: str) -> str:
+        storage = ScratchSpace.storage(folder)
+        return hashlib.sha1(storage.device().data() + storage.rootPath().encode()).hexdigest()[:16]
+
+    def throughput(self, folder: str) -> float:
+        return self.settings.value('scratch/{}'.format(ScratchSpace.volumeKey(folder)), 0, type=float)
+
+    def measure(self, folders: List[str]) -> None:
+        # the synced write probe runs in its own thread, volumes are only considered once they have been measured
+        if self.probeThread is not None or not len(folders):
+            return
+        self.probeThread = QThread(self)
+        self.probeWorker = ScratchProbe(folders)
+        self.probeWorker.moveToThread(self.probeThread)
+        self.probeThread.started.connect(self.probeWorker.run)
+        self.probeThread.finished.connect(self.probeThread.deleteLater, Qt.DirectConnection)
+        self.probeWorker.completed.connect(self.measured)
+        self.probeWorker.completed.connect(self.probeWorker.deleteLater, Qt.DirectConnection)
+        self.probeWorker.completed.connect(self.probeThread.quit, Qt.DirectConnection)
+        self.probeThread.start()
+
+    @pyqtSlot(dict)
+    def measured(self, results: dict) -> None:
+        for folder, result in results.items():
+            self.settings.setValue('scratch/{}'.format(ScratchSpace.volumeKey(folder)), result)
+            self.logger.info('scratch space write throughput for {0}: {1:.1f} MB/s'
+                             .format(folder, result / 1000 / 1000))
+        self.probeThread = None
+
+    def select(self, needed: float, extra: List[str]=None) -> str:
+        # fastest measured volume with enough free space wins, the default work folder is the fallback.
+        # volumes not measured yet are probed in the background for later exports
+        best, speed, unmeasured = self.workfolder, -1, []
+        for folder in self.candidates(extra):
+            if ScratchSpace.storage(folder).bytesAvailable() < needed + self.spaceMargin:
+                continue
+            folderspeed = self.throughput(folder)
+            if folderspeed == 0:
+                unmeasured.append(folder)
+            elif folderspeed > speed:
+                best, speed = folder, folderspeed
+        self.measure(unmeasured)
+        try:
+            os.makedirs(best, exist_ok=True)
+        except OSError:
+            self.logger.exception('could not create scratch folder {}'.format(best), exc_info=True)
+            best = self.workfolder
+        return best
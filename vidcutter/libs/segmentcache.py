@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+from typing import List, Optional
+
+from PyQt5.QtCore import QSettings, QStandardPaths, QStorageInfo
+
+try:
+    # noinspection PyPackageRequirements
+    from simplejson import dump, load, JSONDecodeError
+except ImportError:
+    from json import dump, load, JSONDecodeError
+
+
+class SegmentCache:
+    defaultLimit = 2048
+
+    def __init__(self, settings: QSettings, folder: Optional[str]=None):
+        self.settings = settings
+        if folder is None:
+            folder = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), 'segments')
+        self.folder = folder
+        self.logger = logging.getLogger(__name__)
+        # segments are only ever hard linked in and out so each volume holding work files gets its own cache,
+        # keyed by cache folder. volumes the cache cannot be placed on are only reported once
+        self.indexes, self.skipped = {}, set()
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+        except OSError:
+            self.logger.exception('could not create segment cache folder', exc_info=True)
+
+    @property
+    def limit(self) -> int:
+        return self.settings.value('segmentCacheLimit', self.defaultLimit, type=int) * 1024 * 1024
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def cacheFolder(self, file: str) -> Optional[str]:
+        root = QStorageInfo(os.path.dirname(file)).rootPath()
+        if root == QStorageInfo(self.folder).rootPath():
+            return self.folder
+        folder = os.path.join(root, '.vidcutter', 'segments')
+        if os.path.isdir(folder) or os.access(root, os.W_OK):
+            return folder
+        if root not in self.skipped:
+            self.skipped.add(root)
+            self.logger.info('segment caching is off for work files on {}, no cache can be kept there'.format(root))
+        return None
+
+    def index(self, folder: str) -> dict:
+        if folder not in self.indexes:
+            try:
+                with open(os.path.join(folder, 'index.json'), 'r') as f:
+                    self.indexes[folder] = load(f)
+            except (OSError, ValueError, JSONDecodeError):
+                self.indexes[folder] = {}
+        return self.indexes[folder]
+
+    def save(self, folder: str) -> None:
+        try:
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, 'index.json'), 'w') as f:
+                dump(self.indexes[folder], f)
+        except OSError:
+            self.logger.exception('could not write segment cache index', exc_info=True)
+
+    @staticmethod
+    def fingerprint(source: str) -> List:
+        fileinfo = os.stat(source)
+        return [os.path.normcase(os.path.abspath(source)), fileinfo.st_size, fileinfo.st_mtime]
+
+    @staticmethod
+    def key(source: str, args: List[str]) -> str:
+        # the ffmpeg arguments less the output path carry the time range, stream mapping + encoder settings
+        data = repr((SegmentCache.fingerprint(source), args))
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    @staticmethod
+    def place(source: str, target: str) -> None:
+        # hard links only, segments are never copied in or out of the cache
+        if os.path.isfile(target):
+            os.remove(target)
+        os.link(source, target)
+
+    def fetch(self, key: str, output: str) -> bool:
+        folder = self.cacheFolder(output) if self.enabled else None
+        if folder is None or key not in self.index(folder):
+            return False
+        index = self.index(folder)
+        cached = os.path.join(folder, index[key]['file'])
+        if not os.path.isfile(cached):
+            del index[key]
+            self.save(folder)
+            return False
+        try:
+            SegmentCache.place(cached, output)
+        except OSError:
+            self.logger.info('cached segment {} could not be linked, not reused'.format(cached))
+            return False
+        index[key]['used'] = time.time()
+        self.save(folder)
+        self.logger.info('segment cache hit: {}'.format(output))
+        return True
+
+    def store(self, key: str, file: str) -> None:
+        if not self.enabled or not os.path.isfile(file) or os.path.getsize(file) > self.limit:
+            return
+        folder = self.cacheFolder(file)
+        if folder is None:
+            return
+        filename = '{0}{1}'.format(key, os.path.splitext(file)[1])
+        try:
+            os.makedirs(folder, exist_ok=True)
+            SegmentCache.place(file, os.path.join(folder, filename))
+        except OSError:
+            self.logger.info('segment {} could not be linked into the cache, not cached'.format(file))
+            return
+        self.index(folder)[key] = {'file': filename, 'size': os.path.getsize(file), 'used': time.time()}
+        self.evict(folder)
+        self.save(folder)
+
+    def evict(self, folder: str) -> None:
+        # least recently used segments go first until the cache is back under its size limit
+        index = self.index(folder)
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['used']):
+            if total <= self.limit:
+                break
+            try:
+                os.remove(os.path.join(folder, index[key]['file']))
+            except OSError:
+                pass
+            total -= index[key]['size']
+            del index[key]
+
+    def clear(self) -> None:
+        for folder in set(self.indexes) | {self.folder}:
+            shutil.rmtree(folder, ignore_errors=True)
+        self.indexes = {}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#######################################################################
+#
+# VidCutter - media cutter & joiner
+#
+# copyright © 2018 Pete Alexandrou
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#######################################################################
+
+
+import re
+import time
+from typing import Dict
+
+from PyQt5.QtCore import pyqtSignal, QObject
+
+from vidcutter.libs.munch import Munch
+
+
+class ExportTelemetry(QObject):
+    clipUpdated = pyqtSignal(int, float, str)
+    overallUpdated = pyqtSignal(float, str)
+
+    progressPattern = re.compile(r'^(out_time_us|out_time_ms|total_size|fps|progress)=(\S+)$')
+
+    def __init__(self, parent=None):
+        super(ExportTelemetry, self).__init__(parent)
+        self.clips, self.jobs, self.buffers = {}, {}, {}
+        self.started = 0
+
+    def begin(self, durations: Dict[int, float]) -> None:
+        # clip durations in secs keyed by clip index, only clips that are actually cut need to be included
+        self.clips = {index: Munch(duration=max(duration, 0.001), started=0) for index, duration in durations.items()}
+        self.jobs, self.buffers = {}, {}
+        self.started = time.time()
+
+    def update(self, index: int, name: str, data: str) -> None:
+        # ffmpeg -progress output arrives in arbitrary chunks so incomplete lines are held back until the next read
+        key = (index, name)
+        lines = (self.buffers.pop(key, '') + data).split('\n')
+        self.buffers[key] = lines.pop()
+        job = self.jobs.setdefault(key, Munch(out=0.0, size=0, fps=0.0, done=False))
+        for line in lines:
+            match = self.progressPattern.match(line.strip())
+            if match is None:
+                continue
+            field, value = match.groups()
+            if value == 'N/A':
+                continue
+            if field in {'out_time_us', 'out_time_ms'}:
+                job.out = max(int(value) / 1000000, 0)
+            elif field == 'total_size':
+                job.size = int(value)
+            elif field == 'fps':
+                job.fps = float(value)
+            elif field == 'progress':
+                job.done = value == 'end'
+        if index in self.clips:
+            self.report(index)
+
+    def report(self, index: int) -> None:
+        clip = self.clips[index]
+        if not clip.started:
+            clip.started = time.time()
+        jobs = [job for key, job in self.jobs.items() if key[0] == index]
+        done = min(sum(job.out for job in jobs), clip.duration)
+        fps = sum(job.fps for job in jobs if not job.done)
+        self.clipUpdated.emit(index, done / clip.duration,
+                              self.format(fps, None, self.eta(done, clip.duration, time.time() - clip.started)))
+        total = sum(clip.duration for clip in self.clips.values())
+        finished = sum(min(sum(job.out for key, job in self.jobs.items() if key[0] == clipindex), clip.duration)
+                       for clipindex, clip in self.clips.items())
+        elapsed = time.time() - self.started
+        written = sum(job.size for job in self.jobs.values())
+        fps = sum(job.fps for job in self.jobs.values() if not job.done)
+        self.overallUpdated.emit(finished / total,
+                                 self.format(fps, written / elapsed if elapsed > 0 else 0,
+                                             self.eta(finished, total, elapsed)))
+
+    @staticmethod
+    def eta(done: float, total: float, elapsed: float) -> float:
+        if done <= 0 or elapsed <= 0:
+            return -1
+        return (total - done) / (done / elapsed)
+
+    @staticmethod
+    def format(fps: float, rate: float=None, eta: float=-1) -> str:
+        parts = []
+        if fps > 0:
+            parts.append('{:.0f} fps'.format(fps))
+        if rate is not None and rate > 0:
+            parts.append('{:.1f} MB/s'.format(rate / 1000 / 1000))
+        if eta >= 0:
+            parts.append('ETA {0:02d}:{1:02d}'.format(int(eta / 60), int(eta % 60)))
+        return ' | '.join(parts)
@@ -28,18 +28,24 @@ import os
 import re
 import shlex
 import sys
-from bisect import bisect_left
+from bisect import bisect_left, bisect_right
 from functools import partial
-from typing import List, Optional, Union
+from typing import Callable, List, Optional, Union
 
 from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QDir, QFileInfo, QObject, QProcess, QProcessEnvironment, QSettings,
-                          QSize, QStandardPaths, QStorageInfo, QTemporaryFile, QTime)
+                          QSize, QStandardPaths, QStorageInfo, QTemporaryFile, QTime, QTimer)
 from PyQt5.QtGui import QPainter, QPixmap
 from PyQt5.QtWidgets import QMessageBox, QWidget
 
+from vidcutter.libs.analysis import AnalysisJob, AnalysisScheduler
+from vidcutter.libs.analysiscache import AnalysisCache
 from vidcutter.libs.config import Config, InvalidMediaException, Streams, ToolNotFoundException
+from vidcutter.libs.encoders import EncoderRegistry
 from vidcutter.libs.ffmetadata import FFMetadata
+from vidcutter.libs.intervals import complementIntervals, selectIntervals
 from vidcutter.libs.munch import Munch
+from vidcutter.libs.segmentcache import SegmentCache
+from vidcutter.libs.telemetry import ExportTelemetry
 from vidcutter.libs.widgets import VCMessageBox
 
 try:
@@ -54,6 +60,8 @@ class VideoService(QObject):
     finished = pyqtSignal(bool, str)
     error = pyqtSignal(str)
     addScenes = pyqtSignal(list)
+    filterProgress = pyqtSignal(float, str)
+    filtersFinished = pyqtSignal()
 
     frozen = getattr(sys, 'frozen', False)
     spaceWarningThreshold = 200
@@ -69,13 +77,21 @@ class VideoService(QObject):
         self.logger = logging.getLogger(__name__)
         try:
             self.backends = VideoService.findBackends(self.settings)
+            self.encoders = EncoderRegistry(self.backends.ffmpeg, self.settings, self)
+            self.segmentcache = SegmentCache(self.settings)
+            self.analysiscache = AnalysisCache()
+            self.filterscheduler = AnalysisScheduler(parent=self)
+            self.filterjob = None
+            self.telemetry = ExportTelemetry(self)
             self.proc = VideoService.initProc()
             if hasattr(self.proc, 'errorOccurred'):
                 self.proc.errorOccurred.connect(self.cmdError)
             self.lastError = ''
             self.media, self.source = None, None
             self.chapter_metadata = None
-            self.keyframes = []
+            self.keyframes = {}
+            self.probes = {}
+            self.audioargs = {}
             self.streams = Munch()
             self.mappings = []
         except ToolNotFoundException as e:
@@ -99,6 +115,8 @@ class VideoService(QObject):
                 self.mappings.clear()
                 # noinspection PyUnusedLocal
                 [self.mappings.append(True) for i in range(int(self.media.format.nb_streams))]
+                if getattr(self.parent, 'smartcut', False):
+                    self.prepareEncoders()
         except OSError as e:
             if e.errno == errno.ENOENT:
                 errormsg = '{0}: {1}'.format(os.strerror(errno.ENOENT), source)
@@ -251,12 +269,7 @@ class VideoService(QObject):
         if source is None and hasattr(self.media, 'format') and self.parent is not None:
             return self.parent.delta2QTime(float(self.media.format.duration))
         else:
-            args = '-i "{}"'.format(source)
-            result = self.cmdExec(self.backends.ffmpeg, args, True)
-            matches = re.search(r'Duration:\s(?P<hrs>\d+?):(?P<mins>\d+?):(?P<secs>\d+\.\d+?),',
-                                result, re.DOTALL).groupdict()
-            secs, msecs = matches['secs'].split('.')
-            return QTime(int(matches['hrs']), int(matches['mins']), int(secs), int(msecs))
+            return QTime(0, 0).addMSecs(round(float(self.probe(source).format.duration) * 1000))
 
     def codecs(self, source: str = None) -> tuple:
         if source is None and hasattr(self.streams, 'video'):
@@ -279,35 +292,46 @@ class VideoService(QObject):
                 output += '-map 0:{} '.format(stream_id)
         return output
 
+    @staticmethod
+    def muxerFlags(output: str, final: bool=False) -> str:
+        # timestamp + container fix-ups applied by the cut/join command itself so no extra remux pass is needed
+        flags = '-avoid_negative_ts make_zero '
+        if final and os.path.splitext(output)[1].lower() in VideoService.config.faststart_formats:
+            # faststart makes the muxer rewrite the whole file once to move the moov atom up front, so it is only
+            # worth it for the file the user ends up with, never for intermediates
+            flags += '-movflags +faststart '
+        return flags
+
     def finalize(self, source: str) -> bool:
-        self.checkDiskSpace(source)
-        source_file, source_ext = os.path.splitext(source)
-        final_filename = '{0}_FINAL{1}'.format(source_file, source_ext)
-        args = '-v error -i "{}" -map 0 -c copy -y "{}"'.format(source, final_filename)
-        result = self.cmdExec(self.backends.ffmpeg, args)
-        if result and os.path.exists(final_filename):
-            os.replace(final_filename, source)
-            return True
-        return False
+        # all fix-ups previously done here via a full -c copy remux are now folded into the cut/join commands
+        # (see muxerFlags), so only verify the output was written
+        if not os.path.isfile(source) or os.path.getsize(source) < 1000:
+            self.logger.error('final media file is missing or empty: {}'.format(source))
+            return False
+        return True
 
     def cut(self, source: str, output: str, frametime: str, duration: str, allstreams: bool=True, vcodec: str=None,
-            run: bool=True) -> Union[bool, str]:
+            run: bool=True, seekpoint: float=None, acodec: str=None,
+            progress: Callable[[str], None]=None, final: bool=False) -> Union[bool, str]:
         self.checkDiskSpace(output)
         stream_map = self.parseMappings(allstreams)
         if vcodec is not None:
             encode_options = VideoService.config.encoding.get(vcodec, vcodec)
-            args = '-v 32 -i "{}" -ss {} -t {} -c:v {} -c:a copy -c:s copy {}-avoid_negative_ts 1 ' \
-                   '-y "{}"'.format(source, frametime, duration, encode_options, stream_map, output)
+            # seek the input to the keyframe at or before the cut so only that GOP is decoded, then trim the rest
+            seekpoint = float(frametime) if seekpoint is None else seekpoint
+            args = '-v 32 -progress pipe:1 -nostats -ss {} -i "{}" -ss {} -t {} -c:v {} {} -c:s copy {}{}' \
+                   '-y "{}"'.format(seekpoint, source, max(float(frametime) - seekpoint, 0), duration, encode_options,
+                                    acodec or '-c:a copy', stream_map, VideoService.muxerFlags(output, final), output)
         else:
-            args = '-v error -ss {} -t {} -i "{}" -c copy {}-avoid_negative_ts 1 -y "{}"' \
-                   .format(frametime, duration, source, stream_map, output)
+            args = '-v error -progress pipe:1 -nostats -ss {} -t {} -i "{}" -c copy {}{}-y "{}"' \
+                   .format(frametime, duration, source, stream_map, VideoService.muxerFlags(output, final), output)
         if run:
-            result = self.cmdExec(self.backends.ffmpeg, args)
+            result = self.cmdExec(self.backends.ffmpeg, args, progress=progress)
             if not result or os.path.getsize(output) < 1000:
                 if allstreams:
                     # cut failed so try again without mapping all media streams
                     self.logger.info('cut resulted in zero length file, trying again without all stream mapping')
-                    self.cut(source, output, frametime, duration, False)
+                    self.cut(source, output, frametime, duration, False, progress=progress, final=final)
                 else:
                     # both attempts to cut have failed so exit and let user know
                     VideoService.cleanup([output])
@@ -318,19 +342,118 @@ class VideoService(QObject):
                 self.logger.info(args)
             return args
 
+    def clipKey(self, source: str, output: str, start: float, end: float) -> str:
+        args = ['clip', '{:.6f}'.format(start), '{:.6f}'.format(end), os.path.splitext(output)[1].lower(),
+                self.parseMappings(True)]
+        return SegmentCache.key(source, args)
+
+    def getAudioEncoderArgs(self, source: str, allstreams: bool=True) -> str:
+        # boundary audio is re-encoded to match each source track so it is trimmed to the sample, not the packet
+        stream_map = self.parseMappings(allstreams)
+        cachekey = (os.path.normcase(os.path.abspath(source)), stream_map)
+        if cachekey in self.audioargs:
+            return self.audioargs[cachekey]
+        streams = self.probe(source).streams
+        if stream_map == '':
+            # ffmpeg only picks one audio track when nothing is mapped
+            streams = [stream for stream in streams if stream.codec_type == 'audio'][:1]
+        elif stream_map != '-map 0 ':
+            streams = [stream for stream in streams if '-map 0:{} '.format(stream.index) in stream_map]
+        args = []
+        for index, stream in enumerate([stream for stream in streams if stream.codec_type == 'audio']):
+            encoding = VideoService.config.audio_encoding.get(stream.codec_name)
+            if encoding is not None and 'profiles' in encoding and stream.get('profile') not in encoding['profiles']:
+                # e.g. HE-AAC would come back from the encoder as LC and break the concat
+                encoding = None
+            if encoding is None:
+                args.append('-c:a:{0} copy'.format(index))
+                continue
+            args.append('-c:a:{0} {1}'.format(index, encoding['encoder']))
+            if 'profiles' in encoding:
+                args.append('-profile:a:{0} {1}'.format(index, encoding['profiles'][stream.profile]))
+            if 'sample_rate' in stream:
+                args.append('-ar:a:{0} {1}'.format(index, stream.sample_rate))
+            if int(stream.get('channels', 0)) > 0:
+                args.append('-ac:a:{0} {1}'.format(index, stream.channels))
+            if 'bit_rate' in stream:
+                args.append('-b:a:{0} {1}'.format(index, stream.bit_rate))
+        self.audioargs[cachekey] = ' '.join(args) if len(args) else '-c:a copy'
+        return self.audioargs[cachekey]
+
+    def videoStream(self, source: str) -> Munch:
+        if source == self.source and hasattr(self.streams, 'video'):
+            return self.streams.video
+        return [stream for stream in self.probe(source).streams if stream.codec_type == 'video'][0]
+
+    def getBitrate(self, source: str) -> int:
+        stream = self.videoStream(source)
+        if 'bit_rate' in stream:
+            return int(stream.bit_rate)
+        if 'tags' in stream and 'BPS' in stream.tags:
+            return int(stream.tags.BPS)
+        # no per-stream figure (e.g. matroska) so use the container bitrate less any known audio bitrates
+        media = self.probe(source)
+        audio = sum(int(s.bit_rate) for s in media.streams if s.codec_type == 'audio' and 'bit_rate' in s)
+        return max(int(media.format.get('bit_rate', 0)) - audio, 0)
+
+    def prepareEncoders(self) -> None:
+        # SmartCut encoder candidates are benchmarked in the background ahead of the first export
+        if hasattr(self.streams, 'video'):
+            self.encoders.prepare(self.streams.video.codec_name, self.source, self.streams.video)
+
+    def getEncoderArgs(self, source: str, output: str) -> str:
+        # match the source stream's format so re-encoded SmartCut segments concat cleanly with copied ones
+        stream = self.videoStream(source)
+        codec = stream.codec_name
+        selected = self.encoders.select(codec, stream)
+        encoder = selected.options if selected is not None else VideoService.config.encoding.get(codec)
+        if encoder is None:
+            return codec
+        name = encoder.split()[0]
+        args = [encoder]
+        profile = VideoService.config.encoding_profiles.get(codec, {}).get(str(stream.get('profile', '')).lower())
+        if profile is not None:
+            args.append('-profile:v {}'.format(profile))
+        if int(stream.get('level', -99)) > 0:
+            if codec == 'h264':
+                args.append('-level {:.1f}'.format(int(stream.level) / 10))
+            elif codec == 'hevc' and name == 'libx265':
+                args.append('-x265-params level-idc={:.1f}'.format(int(stream.level) / 30))
+            elif codec == 'hevc':
+                args.append('-level {:.1f}'.format(int(stream.level) / 30))
+        if name == 'libx264' and int(stream.get('refs', 0)) > 0:
+            args.append('-refs {}'.format(stream.refs))
+        if 'pix_fmt' in stream:
+            args.append('-pix_fmt {}'.format(stream.pix_fmt))
+        for option in ('color_range', 'color_primaries', 'color_trc', 'color_space'):
+            if stream.get(option, 'unknown') != 'unknown':
+                args.append('-{0} {1}'.format(option if option != 'color_space' else 'colorspace', stream[option]))
+        bitrate = self.getBitrate(source)
+        if bitrate > 0:
+            args.append('-b:v {0} -maxrate {1} -bufsize {2}'.format(bitrate, int(bitrate * 1.5), bitrate * 2))
+        if os.path.splitext(output)[1].lower() in VideoService.config.faststart_formats and 'time_base' in stream:
+            args.append('-video_track_timescale {}'.format(stream.time_base.split('/')[1]))
+        return ' '.join(args)
+
     def smartinit(self, clips: int):
         self.smartcut_jobs = []
         # noinspection PyUnusedLocal
         [
-            self.smartcut_jobs.append(Munch(output='', bitrate=0, allstreams=True, procs={}, files={}, results={}))
+            self.smartcut_jobs.append(Munch(output='', bitrate=0, allstreams=True, final=False, procs={}, files={},
+                                            keys={}, results={}))
             for index in range(clips)
         ]
 
-    def smartcut(self, index: int, source: str, output: str, start: float, end: float, allstreams: bool = True) -> None:
+    def smartcut(self, index: int, source: str, output: str, start: float, end: float, allstreams: bool = True,
+                 final: bool = False) -> None:
         output_file, output_ext = os.path.splitext(output)
         bisections = self.getGOPbisections(source, start, end)
         self.smartcut_jobs[index].output = output
         self.smartcut_jobs[index].allstreams = allstreams
+        self.smartcut_jobs[index].final = final
+        self.smartcut_jobs[index].bitrate = self.getBitrate(source)
+        encoder = self.getEncoderArgs(source, output)
+        audio = self.getAudioEncoderArgs(source, allstreams)
         # ----------------------[ STEP 1 - start of clip if not starting on a keyframe ]-------------------------
         if bisections['start'][1] > bisections['start'][0]:
             self.smartcut_jobs[index].files.update(start='{0}_start_{1}{2}'
@@ -344,11 +467,12 @@ class VideoService(QObject):
                          frametime=str(start),
                          duration=bisections['start'][1] - start,
                          allstreams=allstreams,
-                         vcodec=self.streams.video.codec_name,
-                         run=False)))
+                         vcodec=encoder,
+                         run=False,
+                         seekpoint=bisections['start'][0],
+                         acodec=audio)))
             self.smartcut_jobs[index].procs.update(start=startproc)
             self.smartcut_jobs[index].results.update(start=False)
-            startproc.start()
         # ----------------------[ STEP 2 - cut middle segment of clip ]-------------------------
         self.smartcut_jobs[index].files.update(middle='{0}_middle_{1}{2}'
                                                .format(output_file, '{0:0>2}'.format(index), output_ext))
@@ -366,8 +490,6 @@ class VideoService(QObject):
                      run=False)))
         self.smartcut_jobs[index].procs.update(middle=middleproc)
         self.smartcut_jobs[index].results.update(middle=False)
-        if len(self.smartcut_jobs[index].procs) == 1:
-            middleproc.start()
         # ----------------------[ STEP 3 - end of clip if not ending on a keyframe ]-------------------------
         if bisections['end'][2] > bisections['end'][1]:
             self.smartcut_jobs[index].files.update(end='{0}_end_{1}{2}'
@@ -381,10 +503,45 @@ class VideoService(QObject):
                          frametime=bisections['end'][1],
                          duration=end - bisections['end'][1],
                          allstreams=allstreams,
-                         vcodec=self.streams.video.codec_name,
-                         run=False)))
+                         vcodec=encoder,
+                         run=False,
+                         seekpoint=bisections['end'][1],
+                         acodec=audio)))
             self.smartcut_jobs[index].procs.update(end=endproc)
             self.smartcut_jobs[index].results.update(end=False)
+        for name, proc in self.smartcut_jobs[index].procs.items():
+            # the output path is left out of the key but its container is not
+            self.smartcut_jobs[index].keys[name] = SegmentCache.key(
+                source, proc.arguments()[:-1] + [os.path.splitext(proc.arguments()[-1])[1].lower()])
+            proc.readyReadStandardOutput.connect(partial(self.smartprogress, index, name))
+        self.smartstart(index, 'start' if 'start' in self.smartcut_jobs[index].procs else 'middle')
+
+    def smartstart(self, index: int, name: str) -> None:
+        job = self.smartcut_jobs[index]
+        if self.segmentcache.fetch(job.keys[name], job.files[name]):
+            job.results[name] = True
+            # finish asynchronously like a real cut so the caller has queued every clip before any completes
+            QTimer.singleShot(0, lambda: self.progress.emit(index))
+            QTimer.singleShot(0, lambda: self.smartnext(index, name))
+            return
+        if os.path.isfile(job.files[name]):
+            # never let ffmpeg overwrite a leftover file in place as it may be linked to a cached segment
+            os.remove(job.files[name])
+        job.procs[name].start()
+
+    def smartprogress(self, index: int, name: str) -> None:
+        proc = self.smartcut_jobs[index].procs[name]
+        self.telemetry.update(index, name, proc.readAllStandardOutput().data().decode(errors='replace'))
+
+    def smartnext(self, index: int, name: str) -> None:
+        if self.smartcutError:
+            return
+        if False not in self.smartcut_jobs[index].results.values():
+            self.smartjoin(index)
+        else:
+            following = {'start': 'middle', 'middle': 'end'}.get(name)
+            if following in self.smartcut_jobs[index].procs:
+                self.smartstart(index, following)
 
     @pyqtSlot(int, QProcess.ExitStatus)
     def smartcheck(self, code: int, status: QProcess.ExitStatus) -> None:
@@ -414,13 +571,8 @@ class VideoService(QObject):
                     self.error.emit('SmartCut failed to cut media file. Please ensure your media files are valid '
                                     'otherwise try again with SmartCut disabled.')
                     return
-            if False not in self.smartcut_jobs[index].results.values():
-                self.smartjoin(index)
-            else:
-                if name == 'start':
-                    self.smartcut_jobs[index].procs['middle'].start()
-                elif name == 'middle':
-                    self.smartcut_jobs[index].procs['end'].start()
+            self.segmentcache.store(self.smartcut_jobs[index].keys[name], resultfile)
+            self.smartnext(index, name)
 
     def smartabort(self):
         for job in self.smartcut_jobs:
@@ -439,11 +591,12 @@ class VideoService(QObject):
         ]
         if self.isMPEGcodec(joinlist[1]):
             self.logger.info('smartcut files are MPEG based so join via MPEG-TS')
-            final_join = self.mpegtsJoin(joinlist, self.smartcut_jobs[index].output, None)
+            final_join = self.mpegtsJoin(joinlist, self.smartcut_jobs[index].output, None,
+                                         final=self.smartcut_jobs[index].final)
         if not final_join:
             self.logger.info('smartcut MPEG-TS join failed, retry with standard concat')
             final_join = self.join(joinlist, self.smartcut_jobs[index].output,
-                                   self.smartcut_jobs[index].allstreams, None)
+                                   self.smartcut_jobs[index].allstreams, None, final=self.smartcut_jobs[index].final)
         VideoService.cleanup(joinlist)
         self.finished.emit(final_join, self.smartcut_jobs[index].output)
 
@@ -454,7 +607,8 @@ class VideoService(QObject):
         except FileNotFoundError:
             pass
 
-    def join(self, inputs: List[str], output: str, allstreams: bool=True, chapters: Optional[List[str]]=None) -> bool:
+    def join(self, inputs: List[str], output: str, allstreams: bool=True, chapters: Optional[List[str]]=None,
+             durations: Optional[List[Optional[int]]]=None, final: bool=False) -> bool:
         self.checkDiskSpace(output)
         filelist = os.path.normpath(os.path.join(os.path.dirname(inputs[0]), '_vidcutter.list'))
         with open(filelist, 'w') as f:
@@ -462,23 +616,29 @@ class VideoService(QObject):
         stream_map = '-map 0 ' if allstreams else ''
         ffmetadata = None
         if chapters is not None and len(chapters):
-            ffmetadata = self.getChapterFile(inputs, chapters)
+            ffmetadata = self.getChapterFile(inputs, chapters, durations)
             metadata = '-i "{}" -map_metadata 1 '.format(ffmetadata)
         else:
             metadata = ''
-        args = '-v error -f concat -safe 0 -i "{0}" {1}-c copy {2}-y "{3}"'
-        result = self.cmdExec(self.backends.ffmpeg, args.format(filelist, metadata, stream_map, output))
+        args = '-v error -f concat -safe 0 -i "{0}" {1}-c copy {2}{3}-y "{4}"'
+        result = self.cmdExec(self.backends.ffmpeg, args.format(filelist, metadata, stream_map,
+                                                                VideoService.muxerFlags(output, final), output))
         os.remove(filelist)
         if chapters and ffmetadata is not None:
             os.remove(ffmetadata)
         return result
 
-    def getChapterFile(self, scenes: List[str], titles: List[str]=None) -> str:
+    def getChapterFile(self, scenes: List[str], titles: List[str]=None,
+                       durations: Optional[List[Optional[int]]]=None) -> str:
+        # chapter lengths come from the clip index (in msecs) when known, only files without one are probed
         ffmetadata = FFMetadata()
         pos = 0
         for index, scene in enumerate(scenes):
-            duration = self.duration(scene)
-            end = pos + duration.msecsSinceStartOfDay()
+            if durations is not None and durations[index] is not None:
+                duration = durations[index]
+            else:
+                duration = self.duration(scene).msecsSinceStartOfDay()
+            end = pos + duration
             ffmetadata.add_chapter(pos, end, titles[index])
             pos = end
         ffmetafile = os.path.normpath(os.path.join(os.path.dirname(scenes[0]), 'ffmetadata.txt'))
@@ -508,52 +668,196 @@ class VideoService(QObject):
         return vbsf, absf
 
     def blackdetect(self, min_duration: float) -> None:
+        self.startAnalysis([self.blackBranch()], Munch(length=min_duration))
+
+    def scenedetect(self, threshold: float) -> None:
+        self.startAnalysis([self.sceneBranch()], Munch(gap=Config.filter_settings().scenedetect.min_scene,
+                                                       score=threshold))
+
+    def silencedetect(self, noise: float, min_duration: float) -> None:
+        self.startAnalysis([self.silenceBranch(noise)], Munch(length=min_duration))
+
+    def freezedetect(self, noise: float, min_duration: float) -> None:
+        self.startAnalysis([self.freezeBranch(noise)], Munch(length=min_duration))
+
+    def analyze(self, noise: float) -> None:
+        # one decode feeding every analysis filter, results only go to the analysis cache so each filter can be
+        # applied afterwards without decoding again
+        branches = [self.blackBranch(), self.sceneBranch(),
+                    self.freezeBranch(Config.filter_settings().freezedetect.default_noise)]
+        if len(self.streams.audio):
+            branches.append(self.silenceBranch(noise))
+        self.startAnalysis(branches)
+
+    @staticmethod
+    def blackBranch() -> Munch:
+        # black intervals of any length are collected so the ones crossing chunk borders can be joined before
+        # applying the minimum duration, scenes are the gaps between them
+        settings = Config.filter_settings().blackdetect
+        return AnalysisJob.branch('blackdetect', 'blackdetect=d=0:pic_th={0}:pix_th={1}'
+                                  .format(settings.picture_threshold, settings.pixel_threshold),
+                                  r'black_start:\s*([\d.]+)', r'black_end:\s*([\d.]+)')
+
+    @staticmethod
+    def sceneBranch() -> Munch:
+        # shot changes are reported as single points in time along with their score. every change above the
+        # lowest threshold is collected so other thresholds can be applied to cached results
+        pattern = r'lavfi\.scd\.time:\s*([\d.]+)'
+        return AnalysisJob.branch('scenedetect', 'scdet=t={}'
+                                  .format(Config.filter_settings().scenedetect.min_threshold),
+                                  pattern, pattern, value=r'lavfi\.scd\.score:\s*([\d.]+)')
+
+    @staticmethod
+    def freezeBranch(noise: float) -> Munch:
+        # frozen intervals are dropped, the clips kept are the ranges in between
+        return AnalysisJob.branch('freezedetect', 'freezedetect=n={0}dB:d={1}'
+                                  .format(noise, Config.filter_settings().freezedetect.detect_duration),
+                                  r'freeze_start:\s*([\d.]+)', r'freeze_end:\s*([\d.]+)')
+
+    @staticmethod
+    def silenceBranch(noise: float) -> Munch:
+        # audio only, scenes are the gaps between silences
+        return AnalysisJob.branch('silencedetect', 'silencedetect=n={0}dB:d={1}'
+                                  .format(noise, Config.filter_settings().silencedetect.detect_duration),
+                                  r'silence_start:\s*(-?[\d.]+)', r'silence_end:\s*(-?[\d.]+)', media='a')
+
+    def startAnalysis(self, branches: List[Munch], criteria: Optional[Munch]=None) -> None:
+        # with criteria given the first branch's results are turned into scenes, otherwise results are cached only
         try:
-            args = '-f lavfi -i "movie=\'{0}\',blackdetect=d={1:.1f}[out0]" '.format(os.path.basename(self.source),
-                                                                                     min_duration)
-            args += '-show_entries tags=lavfi.black_start,lavfi.black_end -of default=nw=1 -hide_banner'
-            if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
-                self.logger.info('{0} {1}'.format(self.backends.ffprobe, args))
-            self.filterproc = VideoService.initProc(self.backends.ffprobe, lambda: self.on_blackdetect(min_duration),
-                                                    os.path.dirname(self.source))
-            self.filterproc.setArguments(shlex.split(args))
-            self.filterproc.start()
+            # a new filter run replaces the one feeding the clip index, background analysis carries on filling
+            # the cache but no longer reports to the ui
+            if self.filterjob is not None and self.filterjob.priority == AnalysisScheduler.Interactive:
+                self.filterscheduler.cancel(self.filterjob)
+            self.filterjob = None
+            inputargs, prefilter = self.analysisDecode()
+            keys = {}
+            for branch in branches:
+                # raw results are cached per media file, thresholds applied afterwards are not part of the key
+                args = [branch.filters, branch.media] + ([inputargs, prefilter] if branch.media == 'v' else [])
+                keys[branch.name] = (AnalysisCache.key(self.source, args), args)
+            if criteria is not None:
+                criteria = Munch(name=branches[0].name, length=criteria.get('length', 0), gap=criteria.get('gap', 0),
+                                 score=criteria.get('score', None))
+                self.filterscenes = Munch(since=0.0, scenes=0, last=0.0)
+                cached = self.analysiscache.fetch(keys[criteria.name][0])
+                if cached is not None:
+                    QTimer.singleShot(0, lambda: self.on_analysis(criteria, None, cached))
+                    return
+            else:
+                branches = [branch for branch in branches if self.analysiscache.fetch(keys[branch.name][0]) is None]
+                if not len(branches):
+                    QTimer.singleShot(0, self.filtersFinished.emit)
+                    return
+            # the media is split into chunks of equal length analysed in parallel. chunks overlap for shot change
+            # detection so a cut right on a chunk border is still compared against the frame before it
+            overlap = Config.filter_settings().scenedetect.overlap if 'scenedetect' in keys else 0
+            job = AnalysisJob(self.backends.ffmpeg, self.source, self.duration().msecsSinceStartOfDay() / 1000,
+                              branches, workers=self.filterscheduler.workers,
+                              inputargs=inputargs, prefilter=prefilter, overlap=overlap,
+                              priority=AnalysisScheduler.Interactive if criteria is not None
+                              else AnalysisScheduler.Background, parent=self)
+            job.updated.connect(lambda progress, frontier: self.on_analysis(criteria, job))
+            job.completed.connect(lambda results: self.on_analysed(job, results, keys, criteria))
+            job.failed.connect(lambda msg: self.on_filterfailed(msg) if job is self.filterjob else None)
+            self.filterjob = job
+            job.start(self.filterscheduler)
         except FileNotFoundError:
             self.logger.exception('Could not find media file: {}'.format(self.source), exc_info=True)
             raise
 
-    def on_blackdetect(self, min_duration: float) -> None:
-        if self.filterproc.exitStatus() == QProcess.NormalExit and self.filterproc.exitCode() == 0:
-            scenes = [[QTime(0, 0)]]
-            results = self.filterproc.readAllStandardOutput().data().decode().strip()
-            for line in results.split('\n'):
-                if re.match(r'\[blackdetect @ (.*)\]', line):
-                    vals = line.split(']')[1].strip().split(' ')
-                    start = float(vals[0].replace('black_start:', ''))
-                    end = float(vals[1].replace('black_end:', ''))
-                    dur = float(vals[2].replace('black_duration:', ''))
-                    if dur >= min_duration:
-                        scenes[len(scenes) - 1].append(self.parent.delta2QTime(start))
-                        scenes.append([self.parent.delta2QTime(end)])
-            last = scenes[len(scenes) - 1][0]
-            dur = self.duration()
-            if last < dur and (last.msecsTo(dur) / 1000) >= min_duration:
-                scenes[len(scenes) - 1].append(dur)
-            else:
-                scenes.pop()
+    def on_analysed(self, job: AnalysisJob, results: dict, keys: dict, criteria: Optional[Munch]) -> None:
+        for name, intervals in results.items():
+            self.analysiscache.store(keys[name][0], job.source, keys[name][1], intervals)
+        if job is not self.filterjob:
+            return
+        if criteria is not None:
+            self.on_analysis(criteria, job, results[criteria.name])
+        else:
+            self.filtersFinished.emit()
+
+    def analysisDecode(self) -> tuple:
+        # returns the decoder input options and the filter chain placed ahead of a video analysis filter
+        mode = self.settings.value('analysisDecode', 'fast', type=str)
+        options = Config.filter_settings().decode.get(mode, Config.filter_settings().decode.fast)
+        inputargs = options.args
+        if options.lowres and self.streams.video.codec_name in options.lowres_codecs:
+            inputargs += ' -lowres {}'.format(options.lowres)
+        prefilter = 'scale={}:-2:flags=fast_bilinear,'.format(options.width) if options.width else ''
+        prefilter += 'format={},'.format(options.pix_fmt) if options.pix_fmt else ''
+        return inputargs, prefilter
+
+    def on_analysis(self, criteria: Optional[Munch], job: Optional[AnalysisJob],
+                    intervals: Optional[List[list]]=None) -> None:
+        # scenes lie between detected intervals and are passed on as soon as the analysis has moved past them.
+        # intervals shorter than criteria.length or scoring below criteria.score are ignored, as are those
+        # closer than criteria.gap to the previous one
+        if job is not self.filterjob:
+            return
+        if criteria is None:
+            self.filterProgress.emit(job.progress, 'analysed up to {0} | {1}'.format(
+                self.parent.delta2QTime(job.frontier).toString('hh:mm:ss'),
+                ', '.join('{0}: {1}'.format(name, count) for name, count in job.counts().items())))
+            return
+        final = intervals is not None
+        # only intervals past the last one seen are new, those before it were handled on an earlier update
+        if final:
+            intervals = [interval for interval in intervals if interval[1] > self.filterscenes.since]
+        else:
+            intervals = job.settled(criteria.name, self.filterscenes.since)
+        if len(intervals):
+            self.filterscenes.since = intervals[-1][1]
+        detected = selectIntervals(intervals, criteria.length, criteria.score)
+        ranges, self.filterscenes.last = complementIntervals(detected, self.filterscenes.last, criteria.gap)
+        # times stay in seconds up to here, only the scenes handed on are converted
+        scenes = [[self.parent.delta2QTime(start), self.parent.delta2QTime(end)] for start, end in ranges]
+        if final:
+            last, dur = self.parent.delta2QTime(self.filterscenes.last), self.duration()
+            if last < dur and (last.msecsTo(dur) / 1000) >= criteria.length:
+                scenes.append([last, dur])
+        self.filterscenes.scenes += len(scenes)
+        if len(scenes):
             if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
                 self.logger.info(scenes)
             self.addScenes.emit(scenes)
+        if final:
+            self.filtersFinished.emit()
+        else:
+            self.filterProgress.emit(job.progress,
+                                     'analysed up to {0} | {1} scene(s) found'.format(
+                                         self.parent.delta2QTime(job.frontier).toString('hh:mm:ss'),
+                                         self.filterscenes.scenes))
+
+    @pyqtSlot(str)
+    def on_filterfailed(self, msg: str) -> None:
+        self.logger.error(msg)
+        self.filtersFinished.emit()
+
+    def killFilterProc(self, background: bool=False) -> None:
+        # stops the filter run reporting to the ui, background analysis is only stopped when asked for
+        if background:
+            self.filterscheduler.cancelAll()
+        elif self.filterjob is not None and self.filterjob.priority == AnalysisScheduler.Interactive:
+            self.filterscheduler.cancel(self.filterjob)
+        self.filterjob = None
 
-    def killFilterProc(self) -> None:
-        if hasattr(self, 'filterproc') and self.filterproc.state() != QProcess.NotRunning:
-            self.filterproc.kill()
+    @property
+    def backgroundAnalysis(self) -> bool:
+        return True in [job.running and job.priority == AnalysisScheduler.Background
+                        for job in self.filterscheduler.jobs]
 
     def probe(self, source: str) -> Munch:
         try:
+            # probe results are cached per file and reused for as long as the file is unchanged on disk
+            fileinfo = os.stat(source)
+            cachekey = os.path.normcase(os.path.abspath(source))
+            cached = self.probes.get(cachekey)
+            if cached is not None and cached[0] == (fileinfo.st_size, fileinfo.st_mtime):
+                return cached[1]
             args = '-v error -show_streams -show_format -of json "{}"'.format(source)
             json_data = self.cmdExec(self.backends.ffprobe, args, output=True, mergechannels=False)
-            return Munch.fromDict(loads(json_data))
+            media = Munch.fromDict(loads(json_data))
+            self.probes[cachekey] = ((fileinfo.st_size, fileinfo.st_mtime), media)
+            return media
         except FileNotFoundError:
             self.logger.exception('FFprobe could not find media file: {}'.format(source), exc_info=True)
             raise
@@ -562,8 +866,11 @@ class VideoService(QObject):
             raise
 
     def getKeyframes(self, source: str, formatted_time: bool = False) -> list:
-        if len(self.keyframes) and source == self.source:
-            return self.keyframes
+        # keyframe indexes are kept per source file so clips from added media files can be SmartCut too
+        fileinfo = os.stat(source)
+        cachekey = (os.path.normcase(os.path.abspath(source)), fileinfo.st_size, fileinfo.st_mtime)
+        if not formatted_time and cachekey in self.keyframes:
+            return self.keyframes[cachekey]
         timecode = '0:00:00.000000' if formatted_time else 0
         args = '-v error -show_packets -select_streams v -show_entries packet=pts_time,flags ' \
                '{0}-of csv "{1}"'.format('-sexagesimal ' if formatted_time else '', source)
@@ -577,13 +884,25 @@ class VideoService(QObject):
                     keyframe_times.append(timecode[:-3])
                 else:
                     keyframe_times.append(float(timecode))
-        last_keyframe = self.duration().toString('h:mm:ss.zzz')
+        if formatted_time:
+            last_keyframe = self.duration(source).toString('h:mm:ss.zzz')
+        else:
+            last_keyframe = self.duration(source).msecsSinceStartOfDay() / 1000
         if keyframe_times[-1] != last_keyframe:
             keyframe_times.append(last_keyframe)
-        if source == self.source and not formatted_time:
-            self.keyframes = keyframe_times
+        if not formatted_time:
+            self.keyframes[cachekey] = keyframe_times
         return keyframe_times
 
+    def snapToKeyframe(self, source: str, seconds: float, nearest: bool = False) -> float:
+        keyframes = self.getKeyframes(source)
+        # allow for times already sitting on a keyframe but rounded down to msecs
+        pos = bisect_right(keyframes, seconds + 0.001)
+        previous = keyframes[pos - 1] if pos > 0 else keyframes[0]
+        if nearest and pos < len(keyframes) and keyframes[pos] - seconds < seconds - previous:
+            return keyframes[pos]
+        return previous
+
     def getGOPbisections(self, source: str, start: float, end: float) -> dict:
         keyframes = self.getKeyframes(source)
         start_pos = bisect_left(keyframes, start)
@@ -611,42 +930,63 @@ class VideoService(QObject):
         return codec in VideoService.config.mpeg_formats
 
     # noinspection PyBroadException
-    def mpegtsJoin(self, inputs: list, output: str, chapters: Optional[List[str]]=None) -> bool:
+    def mpegtsJoin(self, inputs: list, output: str, chapters: Optional[List[str]]=None,
+                   durations: Optional[List[Optional[int]]]=None, final: bool=False) -> bool:
         result = False
+        ffmetadata = None
+        joinproc = None
         try:
             self.checkDiskSpace(output)
-            outfiles = []
             video_bsf, audio_bsf = self.getBSF(inputs[0])
-            # 1. transcode to mpeg transport streams
+            if os.path.isfile(output):
+                os.remove(output)
+            if chapters is not None and len(chapters):
+                ffmetadata = self.getChapterFile(inputs, chapters, durations)
+                metadata = '-i "{}" -map_metadata 1 '.format(ffmetadata)
+            else:
+                metadata = ''
+            # 1. start the final mux reading one continuous MPEG-TS stream from its stdin
+            args = '-hide_banner -v error -f mpegts -i pipe:0 {0}-c copy {1} {2}"{3}"' \
+                   .format(metadata, audio_bsf, VideoService.muxerFlags(output, final), output)
+            if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
+                self.logger.info('{0} {1}'.format(self.backends.ffmpeg, args))
+            joinproc = VideoService.initProc()
+            joinproc.start(self.backends.ffmpeg, shlex.split(args))
+            if not joinproc.waitForStarted(-1):
+                return result
+            # 2. remux each input to MPEG-TS on stdout and stream it straight into the final mux,
+            #    no intermediate .ts files are written to disk
             for file in inputs:
-                name, _ = os.path.splitext(file)
-                outfile = '{}.ts'.format(name)
-                outfiles.append(outfile)
-                if os.path.isfile(outfile):
-                    os.remove(outfile)
-                args = '-v error -i "{0}" -c copy -map 0 {1} -f mpegts "{2}"'.format(file, video_bsf, outfile)
-                if not self.cmdExec(self.backends.ffmpeg, args):
+                args = '-hide_banner -v error -i "{0}" -c copy -map 0 {1} -f mpegts pipe:1'.format(file, video_bsf)
+                if os.getenv('DEBUG', False) or getattr(self.parent, 'verboseLogs', False):
+                    self.logger.info('{0} {1}'.format(self.backends.ffmpeg, args))
+                remux = VideoService.initProc()
+                remux.setProcessChannelMode(QProcess.SeparateChannels)
+                remux.start(self.backends.ffmpeg, shlex.split(args))
+                while remux.waitForReadyRead(-1) or remux.bytesAvailable():
+                    joinproc.write(remux.readAllStandardOutput())
+                    joinproc.waitForBytesWritten(-1)
+                remux.waitForFinished(-1)
+                if remux.exitStatus() != QProcess.NormalExit or remux.exitCode() != 0:
+                    self.logger.error('MPEG-TS remux failed for {0}: {1}'
+                                      .format(file, remux.readAllStandardError().data().decode().strip()))
+                    joinproc.kill()
+                    joinproc.waitForFinished(-1)
                     return result
-            # 2. losslessly concatenate at the file level
-            if len(outfiles):
-                if os.path.isfile(output):
-                    os.remove(output)
-                ffmetadata = None
-                if chapters is not None and len(chapters):
-                    ffmetadata = self.getChapterFile(outfiles, chapters)
-                    metadata = '-i "{}" -map_metadata 1 '.format(ffmetadata)
-                else:
-                    metadata = ''
-                args = '-v error -i "concat:{0}" {1}-c copy {2} "{3}"' \
-                       .format("|".join(map(str, outfiles)), metadata, audio_bsf, output)
-                result = self.cmdExec(self.backends.ffmpeg, args)
-                # 3. cleanup mpegts files
-                [os.remove(file) for file in outfiles]
-                if chapters and ffmetadata is not None:
-                    os.remove(ffmetadata)
+            # 3. signal end of stream so the final mux can write its trailer
+            joinproc.closeWriteChannel()
+            joinproc.waitForFinished(-1)
+            result = joinproc.exitStatus() == QProcess.NormalExit and joinproc.exitCode() == 0
+            if not result:
+                self.logger.error('MPEG-TS join failed: {}'.format(joinproc.readAllStandardOutput().data().decode()))
         except BaseException:
             self.logger.exception('Exception during MPEG-TS join', exc_info=True)
+            if joinproc is not None and joinproc.state() != QProcess.NotRunning:
+                joinproc.kill()
             result = False
+        finally:
+            if ffmetadata is not None and os.path.isfile(ffmetadata):
+                os.remove(ffmetadata)
         return result
 
     def version(self) -> str:
@@ -659,7 +999,7 @@ class VideoService(QObject):
         return self.cmdExec(self.backends.mediainfo, args, True, True)
 
     def cmdExec(self, cmd: str, args: str=None, output: bool=False, suppresslog: bool=False, workdir: str=None,
-                mergechannels: bool=True):
+                mergechannels: bool=True, progress: Callable[[str], None]=None):
         if self.proc.state() == QProcess.NotRunning:
             if cmd == self.backends.mediainfo or not mergechannels:
                 self.proc.setProcessChannelMode(QProcess.SeparateChannels)
@@ -671,7 +1011,17 @@ class VideoService(QObject):
             self.proc.start(cmd, shlex.split(args))
             self.proc.readyReadStandardOutput.connect(
                 partial(self.cmdOut, self.proc.readAllStandardOutput().data().decode().strip()))
-            self.proc.waitForFinished(-1)
+            if progress is not None:
+                # -progress output is fed back as it arrives. waitForFinished emits readyRead itself without
+                # running the event loop, so no user input is handled while the cut blocks
+                def readprogress():
+                    progress(self.proc.readAllStandardOutput().data().decode(errors='replace'))
+                self.proc.readyReadStandardOutput.connect(readprogress)
+                self.proc.waitForFinished(-1)
+                self.proc.readyReadStandardOutput.disconnect(readprogress)
+                readprogress()
+            else:
+                self.proc.waitForFinished(-1)
             if cmd == self.backends.mediainfo or not mergechannels:
                 self.proc.setProcessChannelMode(QProcess.MergedChannels)
             if output:
@@ -24,7 +24,7 @@
 
 import os
 import sys
-from typing import Union
+from typing import List, Union
 
 from PyQt5.QtCore import (pyqtSignal, pyqtSlot, QEasingCurve, QEvent, QObject, QPoint, QPropertyAnimation, Qt, QSize,
                           QTime, QTimer)
@@ -239,9 +239,12 @@ class VCProgressDialog(QDialog):
         self._timerprefix.setObjectName('progresstimer')
         self._timervalue = QLabel(self)
         self._timervalue.setObjectName('progresstimer')
+        self._telemetry = QLabel(self)
+        self._telemetry.setObjectName('progresstimer')
         timerlayout = QHBoxLayout()
         timerlayout.addWidget(self._timerprefix)
         timerlayout.addWidget(self._timervalue)
+        timerlayout.addWidget(self._telemetry)
         self._timerwidget = QWidget(self)
         self._timerwidget.setLayout(timerlayout)
         self._timerwidget.hide()
@@ -253,6 +256,7 @@ class VCProgressDialog(QDialog):
 
     def reset(self, steps: int=0, timer: bool=False) -> None:
         self.setValue(0)
+        self.setTelemetry('')
         self.setRange(0, steps)
         self.setText('Analyzing video source')
         self.showTimer() if timer else self.hideTimer()
@@ -281,6 +285,10 @@ class VCProgressDialog(QDialog):
     def value(self) -> int:
         return self._progress.value()
 
+    @pyqtSlot(str)
+    def setTelemetry(self, text: str) -> None:
+        self._telemetry.setText('| {}'.format(text) if len(text) else '')
+
     def setStyle(self, style: QStyle) -> None:
         self._progress.setStyle(style)
 
@@ -409,6 +417,91 @@ class VCDoubleInputDialog(QDialog):
         self._spinbox.setValue(val)
 
 
+class VCDoubleInputsDialog(QDialog):
+    def __init__(self, parent: QWidget, title: str, fields: List[tuple], desc: str=None):
+        # fields are (label, value, minval, maxval, decimals, step, suffix) tuples, one spinbox each
+        super(VCDoubleInputsDialog, self).__init__(parent, Qt.Dialog | Qt.WindowCloseButtonHint)
+        self._spinboxes = []
+        fieldlayout = QGridLayout()
+        for row, (label, value, minval, maxval, decimals, step, suffix) in enumerate(fields):
+            spinbox = QDoubleSpinBox(self)
+            spinbox.setStyle(QStyleFactory.create('Fusion'))
+            spinbox.setAttribute(Qt.WA_MacShowFocusRect, False)
+            spinbox.setDecimals(decimals)
+            spinbox.setRange(minval, maxval)
+            spinbox.setSingleStep(step)
+            if suffix is not None:
+                spinbox.setSuffix(' {}'.format(suffix))
+            spinbox.setValue(value)
+            fieldlayout.addWidget(QLabel(label, self), row, 0)
+            fieldlayout.addWidget(spinbox, row, 1)
+            self._spinboxes.append(spinbox)
+        startbutton = QPushButton('Start')
+        startbutton.setDefault(True)
+        self.buttons = QDialogButtonBox(self)
+        self.buttons.addButton(startbutton, QDialogButtonBox.AcceptRole)
+        self.buttons.addButton(QDialogButtonBox.Cancel)
+        self.buttons.rejected.connect(self.close)
+        layout = QVBoxLayout()
+        layout.addLayout(fieldlayout)
+        if desc is not None:
+            desc_label = QLabel(desc, self)
+            desc_label.setTextFormat(Qt.RichText)
+            desc_label.setObjectName('dialogdesc')
+            desc_label.setWordWrap(True)
+            layout.addWidget(desc_label)
+        layout.addWidget(self.buttons)
+        self.setLayout(layout)
+        self.setWindowTitle(title)
+
+    @property
+    def values(self) -> List[float]:
+        return [spinbox.value() for spinbox in self._spinboxes]
+
+
+class VCTimeRangeDialog(QDialog):
+    def __init__(self, parent: QWidget, title: str, start: QTime, end: QTime, duration: QTime, timeformat: str,
+                 desc: str=None):
+        super(VCTimeRangeDialog, self).__init__(parent, Qt.Dialog | Qt.WindowCloseButtonHint)
+        self._start = self._timeEdit(start, duration, timeformat)
+        self._end = self._timeEdit(end, duration, timeformat)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        fieldlayout = QGridLayout()
+        fieldlayout.addWidget(QLabel('Start:', self), 0, 0)
+        fieldlayout.addWidget(self._start, 0, 1)
+        fieldlayout.addWidget(QLabel('End:', self), 1, 0)
+        fieldlayout.addWidget(self._end, 1, 1)
+        layout = QVBoxLayout()
+        layout.addLayout(fieldlayout)
+        if desc is not None:
+            desc_label = QLabel(desc, self)
+            desc_label.setTextFormat(Qt.RichText)
+            desc_label.setObjectName('dialogdesc')
+            desc_label.setWordWrap(True)
+            layout.addWidget(desc_label)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+        self.setWindowTitle(title)
+
+    def _timeEdit(self, value: QTime, maxval: QTime, timeformat: str) -> QTimeEdit:
+        timeedit = QTimeEdit(value, self)
+        timeedit.setStyle(QStyleFactory.create('Fusion'))
+        timeedit.setAttribute(Qt.WA_MacShowFocusRect, False)
+        timeedit.setDisplayFormat(timeformat)
+        timeedit.setTimeRange(QTime(0, 0), maxval)
+        return timeedit
+
+    @property
+    def start(self) -> QTime:
+        return self._start.time()
+
+    @property
+    def end(self) -> QTime:
+        return self._end.time()
+
+
 class VCBlinkText(QWidget):
     def __init__(self, text: str, parent=None):
         super(VCBlinkText, self).__init__(parent)
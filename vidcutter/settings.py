@@ -502,6 +502,41 @@ class GeneralPage(QWidget):
         smartCutCheckboxLayout.addWidget(smartCutCheckboxLabel)
         smartCutCheckboxLayout.addStretch(1)
 
+        self.snapCheckbox = QCheckBox('Snap clips to keyframes', self)
+        self.snapCheckbox.setToolTip('Move clip start times onto keyframes for exact stream copy cuts')
+        self.snapCheckbox.setCursor(Qt.PointingHandCursor)
+        self.snapCheckbox.setChecked(self.parent.parent.keyframeSnap != 'off')
+        self.snapCheckbox.stateChanged.connect(self.setKeyframeSnap)
+        self.snapNearestRadio = QRadioButton('Nearest keyframe', self)
+        self.snapNearestRadio.setToolTip('Snap clip start to the closest keyframe before or after it')
+        self.snapNearestRadio.setCursor(Qt.PointingHandCursor)
+        self.snapNearestRadio.setChecked(self.parent.parent.keyframeSnap == 'nearest')
+        self.snapPreviousRadio = QRadioButton('Previous keyframe', self)
+        self.snapPreviousRadio.setToolTip('Snap clip start to the keyframe at or before it')
+        self.snapPreviousRadio.setCursor(Qt.PointingHandCursor)
+        self.snapPreviousRadio.setChecked(self.parent.parent.keyframeSnap != 'nearest')
+        snapButtonGroup = QButtonGroup(self)
+        snapButtonGroup.addButton(self.snapPreviousRadio, 1)
+        snapButtonGroup.addButton(self.snapNearestRadio, 2)
+        # noinspection PyUnresolvedReferences
+        snapButtonGroup.buttonClicked[int].connect(self.setKeyframeSnap)
+        self.snapPreviousRadio.setEnabled(self.snapCheckbox.isChecked())
+        self.snapNearestRadio.setEnabled(self.snapCheckbox.isChecked())
+        snapLabel = QLabel('''
+            <b>ON:</b> with SmartCut off, clip start times are moved onto keyframes so stream copy cuts begin
+            exactly where the clip index shows
+            <br/>
+            <b>OFF:</b> clip start times are kept as set
+        ''', self)
+        snapLabel.setObjectName('snaplabel')
+        snapLabel.setTextFormat(Qt.RichText)
+        snapLabel.setWordWrap(True)
+        snapRadioLayout = QHBoxLayout()
+        snapRadioLayout.setContentsMargins(22, 0, 0, 0)
+        snapRadioLayout.addWidget(self.snapPreviousRadio)
+        snapRadioLayout.addWidget(self.snapNearestRadio)
+        snapRadioLayout.addStretch(1)
+
         chaptersCheckbox = QCheckBox('Create chapters per clip', self)
         chaptersCheckbox.setToolTip('Automatically create chapters per clip')
         chaptersCheckbox.setCursor(Qt.PointingHandCursor)
@@ -528,6 +563,33 @@ class GeneralPage(QWidget):
         keepClipsLabel.setObjectName('keepclipslabel')
         keepClipsLabel.setTextFormat(Qt.RichText)
         keepClipsLabel.setWordWrap(True)
+        incrementalCheckbox = QCheckBox('Incremental exports', self)
+        incrementalCheckbox.setToolTip('Reuse unchanged clips from previous exports')
+        incrementalCheckbox.setCursor(Qt.PointingHandCursor)
+        incrementalCheckbox.setChecked(self.parent.parent.incrementalExport)
+        incrementalCheckbox.stateChanged.connect(self.incrementalExport)
+        incrementalLabel = QLabel('''
+            <b>ON:</b> clips left unchanged since a previous export are reused from cache, only edited clips
+            are cut again
+            <br/>
+            <b>OFF:</b> every clip is cut again on each export
+        ''', self)
+        incrementalLabel.setObjectName('incrementallabel')
+        incrementalLabel.setTextFormat(Qt.RichText)
+        incrementalLabel.setWordWrap(True)
+        analysisCheckbox = QCheckBox('Fast media analysis', self)
+        analysisCheckbox.setToolTip('Decode at reduced resolution when detecting scenes')
+        analysisCheckbox.setCursor(Qt.PointingHandCursor)
+        analysisCheckbox.setChecked(self.parent.settings.value('analysisDecode', 'fast', type=str) == 'fast')
+        analysisCheckbox.stateChanged.connect(self.analysisDecode)
+        analysisLabel = QLabel('''
+            <b>ON:</b> scene detection filters decode a small grayscale picture, much faster on HD/4K media
+            <br/>
+            <b>OFF:</b> media is decoded at full quality for analysis
+        ''', self)
+        analysisLabel.setObjectName('analysislabel')
+        analysisLabel.setTextFormat(Qt.RichText)
+        analysisLabel.setWordWrap(True)
         self.singleInstance = self.parent.settings.value('singleInstance', 'on', type=str) in {'on', 'true'}
         singleInstanceCheckbox = QCheckBox('Allow only one running instance', self)
         singleInstanceCheckbox.setToolTip('Allow just one single {} instance to be running'
@@ -547,12 +609,22 @@ class GeneralPage(QWidget):
         generalLayout.addLayout(smartCutCheckboxLayout)
         generalLayout.addLayout(smartCutLayout)
         generalLayout.addLayout(SettingsDialog.lineSeparator())
+        generalLayout.addWidget(self.snapCheckbox)
+        generalLayout.addLayout(snapRadioLayout)
+        generalLayout.addWidget(snapLabel)
+        generalLayout.addLayout(SettingsDialog.lineSeparator())
         generalLayout.addWidget(chaptersCheckbox)
         generalLayout.addWidget(chaptersLabel)
         generalLayout.addLayout(SettingsDialog.lineSeparator())
         generalLayout.addWidget(keepClipsCheckbox)
         generalLayout.addWidget(keepClipsLabel)
         generalLayout.addLayout(SettingsDialog.lineSeparator())
+        generalLayout.addWidget(incrementalCheckbox)
+        generalLayout.addWidget(incrementalLabel)
+        generalLayout.addLayout(SettingsDialog.lineSeparator())
+        generalLayout.addWidget(analysisCheckbox)
+        generalLayout.addWidget(analysisLabel)
+        generalLayout.addLayout(SettingsDialog.lineSeparator())
         generalLayout.addWidget(singleInstanceCheckbox)
         generalLayout.addWidget(singleInstanceLabel)
         generalGroup = QGroupBox('General')
@@ -609,6 +681,16 @@ class GeneralPage(QWidget):
     def setSmartCut(self, state: int) -> None:
         self.parent.parent.toggleSmartCut(state == Qt.Checked)
 
+    @pyqtSlot(int)
+    def setKeyframeSnap(self, state: int) -> None:
+        self.snapPreviousRadio.setEnabled(self.snapCheckbox.isChecked())
+        self.snapNearestRadio.setEnabled(self.snapCheckbox.isChecked())
+        if not self.snapCheckbox.isChecked():
+            mode = 'off'
+        else:
+            mode = 'nearest' if self.snapNearestRadio.isChecked() else 'previous'
+        self.parent.parent.setKeyframeSnap(mode)
+
     @pyqtSlot(int)
     def setSingleInstance(self, state: int) -> None:
         self.singleInstance = (state == Qt.Checked)
@@ -625,6 +707,15 @@ class GeneralPage(QWidget):
         self.parent.parent.saveSetting('keepClips', state == Qt.Checked)
         self.parent.parent.keepClips = (state == Qt.Checked)
 
+    @pyqtSlot(int)
+    def incrementalExport(self, state: int) -> None:
+        self.parent.parent.saveSetting('incrementalExport', state == Qt.Checked)
+        self.parent.parent.incrementalExport = (state == Qt.Checked)
+
+    @pyqtSlot(int)
+    def analysisDecode(self, state: int) -> None:
+        self.parent.settings.setValue('analysisDecode', 'fast' if state == Qt.Checked else 'full')
+
     def setSpinnerValue(self, box_id: int, val: float) -> None:
         self.parent.settings.setValue('level{}Seek'.format(box_id), val)
         if box_id == 1:
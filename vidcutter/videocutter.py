@@ -23,6 +23,7 @@
 #######################################################################
 
 import logging
+import math
 import os
 import re
 import sys
@@ -54,14 +55,17 @@ from vidcutter.videosliderwidget import VideoSliderWidget
 from vidcutter.videostyle import VideoStyleDark, VideoStyleLight
 
 from vidcutter.libs.config import Config, InvalidMediaException, VideoFilter
+from vidcutter.libs.exportjournal import ExportJournal
+from vidcutter.libs.exportplanner import ExportPlanner
 from vidcutter.libs.mpvwidget import mpvWidget
 from vidcutter.libs.munch import Munch
 from vidcutter.libs.notifications import JobCompleteNotification
+from vidcutter.libs.scratchspace import ScratchSpace
 from vidcutter.libs.taskbarprogress import TaskbarProgress
 from vidcutter.libs.videoservice import VideoService
-from vidcutter.libs.widgets import (ClipErrorsDialog, VCBlinkText, VCDoubleInputDialog, VCFilterMenuAction,
-                                    VCFrameCounter, VCInputDialog, VCMessageBox, VCProgressDialog, VCTimeCounter,
-                                    VCToolBarButton, VCVolumeSlider)
+from vidcutter.libs.widgets import (ClipErrorsDialog, VCBlinkText, VCDoubleInputDialog, VCDoubleInputsDialog,
+                                    VCFilterMenuAction, VCFrameCounter, VCInputDialog, VCMessageBox, VCProgressDialog,
+                                    VCTimeCounter, VCTimeRangeDialog, VCToolBarButton, VCVolumeSlider)
 
 import vidcutter
 
@@ -78,12 +82,13 @@ class VideoCutter(QWidget):
         self.logger = logging.getLogger(__name__)
         self.parent = parent
         self.theme = self.parent.theme
-        self.workFolder = self.parent.WORKING_FOLDER
+        self.workFolder = self.parent.workingFolder()
         self.settings = self.parent.settings
         self.filter_settings = Config.filter_settings()
         self.currentMedia, self.mediaAvailable, self.mpvError = None, False, False
         self.projectDirty, self.projectSaved, self.debugonstart = False, False, False
         self.smartcut_monitor, self.notify = None, None
+        self.exportPlan, self.exportStarted, self.exportKeys = None, 0, []
         self.fonts = []
 
         self.initTheme()
@@ -108,21 +113,35 @@ class VideoCutter(QWidget):
         self.enablePBO = self.settings.value('enablePBO', 'off', type=str) in {'on', 'true'}
         self.keepRatio = self.settings.value('aspectRatio', 'keep', type=str) == 'keep'
         self.keepClips = self.settings.value('keepClips', 'off', type=str) in {'on', 'true'}
+        self.incrementalExport = self.settings.value('incrementalExport', 'on', type=str) in {'on', 'true'}
         self.nativeDialogs = self.settings.value('nativeDialogs', 'on', type=str) in {'on', 'true'}
         self.indexLayout = self.settings.value('indexLayout', 'right', type=str)
         self.timelineThumbs = self.settings.value('timelineThumbs', 'on', type=str) in {'on', 'true'}
         self.showConsole = self.settings.value('showConsole', 'off', type=str) in {'on', 'true'}
         self.smartcut = self.settings.value('smartcut', 'off', type=str) in {'on', 'true'}
+        self.keyframeSnap = self.settings.value('keyframeSnap', 'off', type=str)
         self.level1Seek = self.settings.value('level1Seek', 2, type=float)
         self.level2Seek = self.settings.value('level2Seek', 5, type=float)
         self.verboseLogs = self.parent.verboseLogs
         self.lastFolder = self.settings.value('lastFolder', QDir.homePath(), type=str)
 
         self.videoService = VideoService(self.settings, self)
-        self.videoService.progress.connect(self.seekSlider.updateProgress)
+        self.videoService.progress.connect(self.clipProgress)
+        self.videoService.telemetry.clipUpdated.connect(self.clipTelemetry)
+        self.videoService.telemetry.overallUpdated.connect(self.exportTelemetry)
         self.videoService.finished.connect(self.smartmonitor)
         self.videoService.error.connect(self.completeOnError)
         self.videoService.addScenes.connect(self.addScenes)
+        self.videoService.filterProgress.connect(self.updateFilterProgress)
+        self.videoService.filtersFinished.connect(self.filtersFinished)
+        # scenes streamed in by the filters are rendered in batches rather than once per detection
+        self.scenesTimer = QTimer(self)
+        self.scenesTimer.setSingleShot(True)
+        self.scenesTimer.setInterval(500)
+        self.scenesTimer.timeout.connect(self.renderScenes)
+        self.journal = ExportJournal(self.parent.journalPath())
+        self.planner = ExportPlanner(self.videoService, self.settings,
+                                     ScratchSpace(self.settings, self.workFolder, self))
 
         self.project_files = {
             'edl': re.compile(r'(\d+(?:\.?\d+)?)\t(\d+(?:\.?\d+)?)\t([01])'),
@@ -132,6 +151,7 @@ class VideoCutter(QWidget):
         self._initIcons()
         self._initActions()
 
+        self.filterActions, self.filtersRunning = [], False
         self.appmenu = QMenu(self.parent)
         self.clipindex_removemenu, self.clipindex_contextmenu = QMenu(self), QMenu(self)
 
@@ -556,6 +576,8 @@ class VideoCutter(QWidget):
                                        statusTip='Remove all clips from list', enabled=False)
         self.editChapterAction = QAction(self.chapterIcon, 'Edit chapter name', self, triggered=self.editChapter,
                                          statusTip='Edit the selected chapter name', enabled=False)
+        self.trimClipAction = QAction('Trim media file', self, triggered=self.trimClip,
+                                      statusTip='Set the portion of an added media file to include', enabled=False)
         self.streamsAction = QAction(self.streamsIcon, 'Media streams', self, triggered=self.selectStreams,
                                      statusTip='Select the media streams to be included', enabled=False)
         self.mediainfoAction = QAction(self.mediaInfoIcon, 'Media information', self, triggered=self.mediaInfo,
@@ -587,21 +609,40 @@ class VideoCutter(QWidget):
     @property
     def _filtersMenu(self) -> QMenu:
         menu = QMenu('Video filters', self)
-        self.blackdetectAction = VCFilterMenuAction(QPixmap(':/images/blackdetect.png'), 'BLACKDETECT',
+        self.blackdetectAction = self._filterAction(VideoFilter.BLACKDETECT, ':/images/blackdetect.png',
                                                     'Create clips via black frame detection',
-                                                    'Useful for skipping commercials or detecting scene transitions',
-                                                    self)
-        if sys.platform == 'darwin':
-            self.blackdetectAction.triggered.connect(lambda: self.configFilters(VideoFilter.BLACKDETECT),
-                                                     Qt.QueuedConnection)
-        else:
-            self.blackdetectAction.triggered.connect(lambda: self.configFilters(VideoFilter.BLACKDETECT),
-                                                     Qt.DirectConnection)
-        self.blackdetectAction.setEnabled(False)
+                                                    'Useful for skipping commercials or detecting scene transitions')
+        self.scenedetectAction = self._filterAction(VideoFilter.SCENEDETECT, ':/images/blackdetect.png',
+                                                    'Create clips via shot change detection',
+                                                    'Useful for splitting edited footage at its hard cuts')
+        self.silencedetectAction = self._filterAction(VideoFilter.SILENCEDETECT, ':/images/blackdetect.png',
+                                                      'Create clips via silence detection',
+                                                      'Useful for splitting talks and interviews at pauses')
+        self.freezedetectAction = self._filterAction(VideoFilter.FREEZEDETECT, ':/images/blackdetect.png',
+                                                     'Create clips via freeze frame detection',
+                                                     'Useful for cutting dead camera segments out of recordings')
+        self.analyzeAction = self._filterAction(VideoFilter.ANALYZE, ':/images/blackdetect.png',
+                                                'Analyze media for all filters in one pass',
+                                                'Decodes once, every filter then runs instantly on the results')
         menu.setIcon(self.filtersIcon)
         menu.addAction(self.blackdetectAction)
+        menu.addAction(self.scenedetectAction)
+        menu.addAction(self.silencedetectAction)
+        menu.addAction(self.freezedetectAction)
+        menu.addSeparator()
+        menu.addAction(self.analyzeAction)
         return menu
 
+    def _filterAction(self, name: VideoFilter, icon: str, text: str, subtext: str) -> VCFilterMenuAction:
+        action = VCFilterMenuAction(QPixmap(icon), name.name, text, subtext, self)
+        if sys.platform == 'darwin':
+            action.triggered.connect(lambda: self.configFilters(name), Qt.QueuedConnection)
+        else:
+            action.triggered.connect(lambda: self.configFilters(name), Qt.DirectConnection)
+        action.setEnabled(False)
+        self.filterActions.append(action)
+        return action
+
     def _initMenus(self) -> None:
         self.appmenu.addAction(self.openProjectAction)
         self.appmenu.addAction(self.saveProjectAction)
@@ -625,6 +666,7 @@ class VideoCutter(QWidget):
         self.appmenu.addAction(self.quitAction)
 
         self.clipindex_contextmenu.addAction(self.editChapterAction)
+        self.clipindex_contextmenu.addAction(self.trimClipAction)
         self.clipindex_contextmenu.addSeparator()
         self.clipindex_contextmenu.addAction(self.moveItemUpAction)
         self.clipindex_contextmenu.addAction(self.moveItemDownAction)
@@ -708,6 +750,7 @@ class VideoCutter(QWidget):
     def itemMenu(self, pos: QPoint) -> None:
         globalPos = self.cliplist.mapToGlobal(pos)
         self.editChapterAction.setEnabled(False)
+        self.trimClipAction.setEnabled(False)
         self.moveItemUpAction.setEnabled(False)
         self.moveItemDownAction.setEnabled(False)
         self.initRemoveMenu()
@@ -716,6 +759,7 @@ class VideoCutter(QWidget):
             if len(self.cliplist.selectedItems()):
                 self.editChapterAction.setEnabled(self.createChapters)
             if not self.inCut:
+                self.trimClipAction.setEnabled(len(self.clipTimes[index][3]) > 0)
                 if index > 0:
                     self.moveItemUpAction.setEnabled(True)
                 if index < self.cliplist.count() - 1:
@@ -734,6 +778,59 @@ class VideoCutter(QWidget):
         self.clipTimes[index][4] = text
         self.renderClipIndex()
 
+    def trimClip(self) -> None:
+        index = self.cliplist.currentRow()
+        clip = self.clipTimes[index]
+        dialog = VCTimeRangeDialog(self, 'Trim media file', clip[0], clip[1], self.videoService.duration(clip[3]),
+                                   self.timeformat, '<p>{}</p>'.format(os.path.basename(clip[3])))
+        dialog.accepted.connect(lambda: self.on_trimClip(index, dialog.start, dialog.end))
+        dialog.exec_()
+
+    def on_trimClip(self, index: int, start: QTime, end: QTime) -> None:
+        if not start < end:
+            QMessageBox.critical(self.parent, 'Invalid END Time',
+                                 'The clip end time must come AFTER it\'s start time. Please try again.')
+            return
+        clip = self.clipTimes[index]
+        if start != clip[0]:
+            clip[2] = self.captureImage(clip[3], start, True)
+        clip[0], clip[1] = start, end
+        self.setProjectDirty()
+        self.showText('media file trimmed')
+        self.renderClipIndex()
+
+    def progressRegion(self, index: int) -> Optional[int]:
+        # timeline regions only exist for clips of the loaded media, the clip index shows progress without them
+        internal = [row for row, clip in enumerate(self.clipTimes) if not len(clip[3])]
+        if not len(internal):
+            return index
+        return internal.index(index) if index in internal else None
+
+    @pyqtSlot(int)
+    def clipProgress(self, index: int) -> None:
+        region = self.progressRegion(index)
+        if region is not None:
+            self.seekSlider.updateProgress(region)
+
+    @pyqtSlot(int, float, str)
+    def clipTelemetry(self, index: int, fraction: float, text: str) -> None:
+        region = self.progressRegion(index)
+        if region is not None:
+            self.seekSlider.updateTelemetry(region, fraction, text)
+
+    @pyqtSlot(float, str)
+    def exportTelemetry(self, fraction: float, text: str) -> None:
+        self.parent.statusBar().showMessage('Exporting {0:.0f}%{1}'.format(fraction * 100,
+                                                                          ' | {}'.format(text) if len(text) else ''))
+        if hasattr(self, 'exportProgressBar') and self.exportProgressBar.isVisible():
+            self.exportProgressBar.setValue(int(fraction * 1000))
+            self.exportProgressBar.setTelemetry(text)
+            # plain cuts block the event loop, paint the dialog now rather than process events mid-cut
+            self.exportProgressBar.repaint()
+
+    def isTrimmed(self, clip: list) -> bool:
+        return len(clip[3]) > 0 and (clip[0] != QTime(0, 0) or clip[1] != self.videoService.duration(clip[3]))
+
     def moveItemUp(self) -> None:
         index = self.cliplist.currentRow()
         if index != -1:
@@ -880,7 +977,7 @@ class VideoCutter(QWidget):
             self.toolbar_start.setEnabled(True)
             self.toolbar_end.setDisabled(True)
             self.seekSlider.setRestrictValue(0, False)
-            self.blackdetectAction.setEnabled(True)
+            self.enableFilters(True)
             self.inCut = False
             self.newproject = True
             QTimer.singleShot(2000, self.selectClip)
@@ -970,6 +1067,9 @@ class VideoCutter(QWidget):
         if not os.path.isfile(filename):
             return
         self.currentMedia = filename
+        if hasattr(self, 'filterProgressBar') and self.filterProgressBar.isVisible():
+            self.filterProgressBar.reject()
+        self.videoService.killFilterProc(True)
         self.initMediaControls(True)
         self.projectDirty, self.projectSaved = False, False
         self.cliplist.clear()
@@ -1032,7 +1132,7 @@ class VideoCutter(QWidget):
         self.fullscreenButton.setEnabled(flag)
         self.fullscreenAction.setEnabled(flag)
         self.seekSlider.clearRegions()
-        self.blackdetectAction.setEnabled(flag)
+        self.enableFilters(flag)
         if flag:
             self.seekSlider.setRestrictValue(0)
         else:
@@ -1151,6 +1251,39 @@ class VideoCutter(QWidget):
         self.saveSetting('smartcut', self.smartcut)
         self.smartcutButton.setChecked(self.smartcut)
         self.showText('SmartCut {}'.format('enabled' if checked else 'disabled'))
+        if checked and self.mediaAvailable:
+            self.videoService.prepareEncoders()
+        if self.snapClips():
+            self.renderClipIndex()
+
+    def setKeyframeSnap(self, mode: str) -> None:
+        self.keyframeSnap = mode
+        self.settings.setValue('keyframeSnap', mode)
+        if self.snapClips():
+            self.renderClipIndex()
+
+    def snapTime(self, cliptime: QTime) -> QTime:
+        # keyframe snapping is the stream copy alternative to SmartCut so it only applies with SmartCut off
+        if self.smartcut or self.keyframeSnap == 'off' or self.currentMedia is None:
+            return cliptime
+        keyframe = self.videoService.snapToKeyframe(self.currentMedia, VideoCutter.qtime2delta(cliptime),
+                                                    self.keyframeSnap == 'nearest')
+        # round up so an input seek to the snapped time still lands on the keyframe itself
+        return QTime(0, 0).addMSecs(math.ceil(round(keyframe * 1000, 3)))
+
+    def snapClips(self) -> bool:
+        changed = False
+        for clip in self.clipTimes:
+            if len(clip[3]) or not isinstance(clip[1], QTime):
+                continue
+            starttime = self.snapTime(clip[0])
+            if starttime != clip[0] and starttime < clip[1]:
+                clip[0] = starttime
+                clip[2] = self.captureImage(self.currentMedia, starttime)
+                changed = True
+        if changed:
+            self.setProjectDirty()
+        return changed
 
     @pyqtSlot(list)
     def addScenes(self, scenes: List[list]) -> None:
@@ -1159,8 +1292,28 @@ class VideoCutter(QWidget):
                 self.clipTimes.append([scene[0], scene[1], self.captureImage(self.currentMedia, scene[0]), '', None])
                 for scene in scenes if len(scene)
             ]
-            self.renderClipIndex()
-        self.filterProgressBar.done(VCProgressDialog.Accepted)
+            if not self.scenesTimer.isActive():
+                self.scenesTimer.start()
+
+    @pyqtSlot()
+    def renderScenes(self) -> None:
+        self.scenesTimer.stop()
+        self.snapClips()
+        self.renderClipIndex()
+
+    @pyqtSlot(float, str)
+    def updateFilterProgress(self, progress: float, text: str) -> None:
+        if hasattr(self, 'filterProgressBar'):
+            self.filterProgressBar.setRange(0, 1000)
+            self.filterProgressBar.setValue(int(progress * 1000))
+            self.filterProgressBar.setTelemetry(text)
+
+    @pyqtSlot()
+    def filtersFinished(self) -> None:
+        if self.scenesTimer.isActive():
+            self.renderScenes()
+        if hasattr(self, 'filterProgressBar'):
+            self.filterProgressBar.done(VCProgressDialog.Accepted)
 
     @pyqtSlot(VideoFilter)
     def configFilters(self, name: VideoFilter) -> None:
@@ -1178,22 +1331,116 @@ class VideoCutter(QWidget):
                                           partial(self.videoService.blackdetect, d.value), d))
             d.setFixedSize(435, d.sizeHint().height())
             d.exec_()
+        elif name == VideoFilter.SCENEDETECT:
+            desc = '<p>Detect hard cuts between shots by comparing each frame with the one before it. A clip is ' \
+                   'created for every shot found. Lower the threshold above to detect subtler changes, raise it ' \
+                   'if camera motion or flashes are reported as cuts.</p>' \
+                   '<p><b>WARNING:</b> this can take a long time to complete depending on the length and quality ' \
+                   'of the source media.</p>'
+            d = VCDoubleInputDialog(self, 'SCENEDETECT - Filter settings', 'Shot change threshold:',
+                                    self.filter_settings.scenedetect.default_threshold,
+                                    self.filter_settings.scenedetect.min_threshold,
+                                    self.filter_settings.scenedetect.max_threshold, 1, 1.0, desc, '%')
+            d.buttons.accepted.connect(
+                lambda: self.startFilters('detecting scenes (press ESC to cancel)',
+                                          partial(self.videoService.scenedetect, d.value), d))
+            d.setFixedSize(435, d.sizeHint().height())
+            d.exec_()
+        elif name == VideoFilter.SILENCEDETECT:
+            if not len(self.videoService.streams.audio):
+                VCMessageBox('SILENCEDETECT', 'No audio found', 'The media file has no audio track to analyze.',
+                             parent=self).exec_()
+                return
+            desc = '<p>Detect pauses in the audio track, only audio is decoded so this is a lot faster than the ' \
+                   'video filters. A clip is created for every stretch between two silences. Sound quieter ' \
+                   'than the noise floor above counts as silence once it lasts for the minimum duration.</p>'
+            d = VCDoubleInputsDialog(self, 'SILENCEDETECT - Filter settings', [
+                ('Noise floor:', self.filter_settings.silencedetect.default_noise,
+                 self.filter_settings.silencedetect.min_noise, self.filter_settings.silencedetect.max_noise,
+                 1, 1.0, 'dB'),
+                ('Minimum duration for silences:', self.filter_settings.silencedetect.default_duration,
+                 self.filter_settings.silencedetect.min_duration, 999.9, 1, 0.1, 'secs')
+            ], desc)
+            d.buttons.accepted.connect(
+                lambda: self.startFilters('detecting scenes (press ESC to cancel)',
+                                          partial(self.videoService.silencedetect, *d.values), d))
+            d.setFixedSize(435, d.sizeHint().height())
+            d.exec_()
+        elif name == VideoFilter.FREEZEDETECT:
+            desc = '<p>Detect stretches where the picture does not change, e.g. a static camera or a paused ' \
+                   'slide. Clips are created for everything in between so the frozen parts are cut out. Picture ' \
+                   'changes below the noise tolerance above still count as frozen.</p>' \
+                   '<p><b>WARNING:</b> this can take a long time to complete depending on the length and quality ' \
+                   'of the source media.</p>'
+            d = VCDoubleInputsDialog(self, 'FREEZEDETECT - Filter settings', [
+                ('Noise tolerance:', self.filter_settings.freezedetect.default_noise,
+                 self.filter_settings.freezedetect.min_noise, self.filter_settings.freezedetect.max_noise,
+                 1, 1.0, 'dB'),
+                ('Minimum duration for frozen scenes:', self.filter_settings.freezedetect.default_duration,
+                 self.filter_settings.freezedetect.min_duration, 9999.9, 1, 0.5, 'secs')
+            ], desc)
+            d.buttons.accepted.connect(
+                lambda: self.startFilters('detecting scenes (press ESC to cancel)',
+                                          partial(self.videoService.freezedetect, *d.values), d))
+            d.setFixedSize(435, d.sizeHint().height())
+            d.exec_()
+        elif name == VideoFilter.ANALYZE:
+            if self.videoService.backgroundAnalysis:
+                self.showText('media analysis is already running')
+                return
+            desc = '<p>Run black frame, shot change, freeze frame and silence detection together over a single ' \
+                   'decode of the media. No clips are created, the results are kept so that each filter can ' \
+                   'afterwards be applied in an instant. Silence detection uses the noise floor above, freeze ' \
+                   'frame detection its default noise tolerance.</p>' \
+                   '<p><b>WARNING:</b> this can take a long time to complete depending on the length and quality ' \
+                   'of the source media.</p>'
+            d = VCDoubleInputDialog(self, 'ANALYZE - Filter settings', 'Noise floor for silences:',
+                                    self.filter_settings.silencedetect.default_noise,
+                                    self.filter_settings.silencedetect.min_noise,
+                                    self.filter_settings.silencedetect.max_noise, 1, 1.0, desc, 'dB')
+            d.buttons.accepted.connect(
+                lambda: self.startFilters('analyzing media (press ESC to continue in the background)',
+                                          partial(self.videoService.analyze, d.value), d, True))
+            d.setFixedSize(435, d.sizeHint().height())
+            d.exec_()
 
-    @pyqtSlot(str, partial, QDialog)
-    def startFilters(self, progress_text: str, filter_func: partial, config_dialog: QDialog) -> None:
+    @pyqtSlot(str, partial, QDialog, bool)
+    def startFilters(self, progress_text: str, filter_func: partial, config_dialog: QDialog,
+                     background: bool=False) -> None:
+        # the app stays usable while filters run so streamed scenes can be reviewed as they come in. other filters,
+        # starting a clip and saving are held back until this one is done as scenes are appended to the clip index.
+        # background analysis just fills the analysis cache
         config_dialog.close()
-        self.parent.lock_gui(True)
-        self.filterProgress(progress_text)
+        if not background:
+            self.filtersRunning = True
+            self.enableFilters(False)
+            self.toolbar_start.setEnabled(False)
+            self.toolbar_save.setEnabled(False)
+        self.filterProgress(progress_text, background)
         filter_func()
 
-    @pyqtSlot()
-    def stopFilters(self) -> None:
-        self.videoService.killFilterProc()
-        self.parent.lock_gui(False)
+    @pyqtSlot(int, bool)
+    def stopFilters(self, result: int, background: bool=False) -> None:
+        if background:
+            if result != VCProgressDialog.Accepted:
+                self.showText('media analysis continues in the background')
+            return
+        if result != VCProgressDialog.Accepted:
+            self.videoService.killFilterProc()
+        self.filtersRunning = False
+        self.enableFilters(not self.inCut and self.mediaAvailable)
+        self.toolbar_start.setEnabled(not self.inCut and self.mediaAvailable)
+        self.renderClipIndex()
+
+    def enableFilters(self, enabled: bool) -> None:
+        [action.setEnabled(enabled and not self.filtersRunning) for action in self.filterActions]
 
-    def filterProgress(self, msg: str) -> None:
+    def filterProgress(self, msg: str, background: bool=False) -> None:
+        if hasattr(self, 'filterProgressBar') and self.filterProgressBar.isVisible():
+            # a dialog still showing belongs to a background analysis, which carries on without it
+            self.filterProgressBar.reject()
         self.filterProgressBar = VCProgressDialog(self, modal=False)
-        self.filterProgressBar.finished.connect(self.stopFilters)
+        self.filterProgressBar.finished.connect(lambda result: self.stopFilters(result, background))
         self.filterProgressBar.setText(msg)
         self.filterProgressBar.setMinimumWidth(600)
         self.filterProgressBar.show()
@@ -1217,7 +1464,7 @@ class VideoCutter(QWidget):
                     file4Test = lastItem[3] if len(lastItem[3]) else self.currentMedia
                     if self.videoService.testJoin(file4Test, file):
                         self.clipTimes.append([QTime(0, 0), self.videoService.duration(file),
-                                               self.captureImage(file, QTime(0, 0, second=2), True), file])
+                                               self.captureImage(file, QTime(0, 0, second=2), True), file, None])
                         filesadded = True
                     else:
                         cliperrors.append((file,
@@ -1225,7 +1472,7 @@ class VideoCutter(QWidget):
                         self.videoService.lastError = ''
                 else:
                     self.clipTimes.append([QTime(0, 0), self.videoService.duration(file),
-                                           self.captureImage(file, QTime(0, 0, second=2), True), file])
+                                           self.captureImage(file, QTime(0, 0, second=2), True), file, None])
                     filesadded = True
             if len(cliperrors):
                 detailedmsg = '''<p>The file(s) listed were found to be incompatible for inclusion to the clip index as
@@ -1249,15 +1496,15 @@ class VideoCutter(QWidget):
         return True in [len(item[3]) > 0 for item in self.clipTimes]
 
     def clipStart(self) -> None:
-        starttime = self.delta2QTime(self.seekSlider.value())
+        starttime = self.snapTime(self.delta2QTime(self.seekSlider.value()))
         self.clipTimes.append([starttime, '', self.captureImage(self.currentMedia, starttime), '', None])
         self.timeCounter.setMinimum(starttime.toString(self.timeformat))
         self.frameCounter.lockMinimum()
         self.toolbar_start.setDisabled(True)
         self.toolbar_end.setEnabled(True)
         self.clipindex_add.setDisabled(True)
-        self.seekSlider.setRestrictValue(self.seekSlider.value(), True)
-        self.blackdetectAction.setDisabled(True)
+        self.seekSlider.setRestrictValue(starttime.msecsSinceStartOfDay(), True)
+        self.enableFilters(False)
         self.inCut = True
         self.showText('clip started at {}'.format(starttime.toString(self.timeformat)))
         self.renderClipIndex()
@@ -1276,7 +1523,7 @@ class VideoCutter(QWidget):
         self.clipindex_add.setEnabled(True)
         self.timeCounter.setMinimum()
         self.seekSlider.setRestrictValue(0, False)
-        self.blackdetectAction.setEnabled(True)
+        self.enableFilters(True)
         self.inCut = False
         self.showText('clip ends at {}'.format(endtime.toString(self.timeformat)))
         self.renderClipIndex()
@@ -1308,6 +1555,8 @@ class VideoCutter(QWidget):
         if self.inCut or len(self.clipTimes) == 0 or not isinstance(self.clipTimes[0][1], QTime):
             self.toolbar_save.setEnabled(False)
             self.saveProjectAction.setEnabled(False)
+        if self.filtersRunning:
+            self.toolbar_save.setEnabled(False)
         self.setRunningTime(self.delta2QTime(self.totalRuntime).toString(self.runtimeformat))
 
     @staticmethod
@@ -1332,6 +1581,13 @@ class VideoCutter(QWidget):
     def captureImage(self, source: str, frametime: QTime, external: bool = False) -> QPixmap:
         return VideoService.captureFrame(self.settings, source, frametime.toString(self.timeformat), external=external)
 
+    def exportClips(self) -> List[Munch]:
+        return [
+            Munch(source=clip[3] if len(clip[3]) else self.currentMedia, start=VideoCutter.qtime2delta(clip[0]),
+                  end=VideoCutter.qtime2delta(clip[1]), external=len(clip[3]) > 0, trimmed=self.isTrimmed(clip))
+            for clip in self.clipTimes
+        ]
+
     def saveMedia(self) -> None:
         clips = len(self.clipTimes)
         source_file, source_ext = os.path.splitext(self.currentMedia if self.currentMedia is not None
@@ -1351,70 +1607,199 @@ class VideoCutter(QWidget):
             if len(ext) == 0 and len(source_ext):
                 self.finalFilename += source_ext
             self.lastFolder = QFileInfo(self.finalFilename).absolutePath()
+            self.exportMedia()
+
+    def exportMedia(self) -> None:
+        clips = len(self.clipTimes)
+        source_file, source_ext = os.path.splitext(self.currentMedia if self.currentMedia is not None
+                                                   else self.clipTimes[0][3])
+        file, _ = os.path.splitext(self.finalFilename)
+        if clips > 0:
+            if self.snapClips():
+                self.renderClipIndex()
             self.toolbar_save.setDisabled(True)
             if not os.path.isdir(self.workFolder):
-                os.mkdir(self.workFolder)
+                os.makedirs(self.workFolder)
+            self.exportPlan = self.planner.plan(self.exportClips(), self.finalFilename, source_ext, self.smartcut,
+                                                self.keepClips)
+            if self.exportPlan.error is not None:
+                self.toolbar_save.setEnabled(True)
+                self.parent.errorHandler(self.exportPlan.error, 'Not enough disk space')
+                return
+            exportwarn = VCMessageBox('Save media', 'Ready to save your media', ExportPlanner.preview(self.exportPlan),
+                                      buttons=QMessageBox.Ok | QMessageBox.Cancel, parent=self)
+            if exportwarn.exec_() == QMessageBox.Cancel:
+                self.toolbar_save.setEnabled(True)
+                return
+            self.exportStarted = time.time()
+            self.exportKeys = self.incrementalKeys()
+            self.journal.start(self.currentMedia, self.journalClips(), self.finalFilename, self.exportPlan)
+            self.videoService.telemetry.begin({
+                index: clip[0].msecsTo(clip[1]) / 1000 for index, clip in enumerate(self.clipTimes)
+                if not len(clip[3]) or self.isTrimmed(clip)
+            })
             if self.smartcut:
                 self.seekSlider.showProgress(6 if clips > 1 else 5)
                 self.parent.lock_gui(True)
+                self.exportProgress()
                 self.videoService.smartinit(clips)
                 self.smartcutter(file, source_file, source_ext)
                 return
             steps = 3 if clips > 1 else 2
             self.seekSlider.showProgress(steps)
             self.parent.lock_gui(True)
-            filename, filelist = '', []
-            for index, clip in enumerate(self.clipTimes):
-                self.seekSlider.updateProgress(index)
-                if len(clip[3]):
-                    filelist.append(clip[3])
-                else:
-                    duration = self.delta2QTime(clip[0].msecsTo(clip[1])).toString(self.timeformat)
-                    filename = '{0}_{1}{2}'.format(file, '{0:0>2}'.format(index), source_ext)
-                    if not self.keepClips:
-                        filename = os.path.join(self.workFolder, os.path.basename(filename))
-                    filename = QDir.toNativeSeparators(filename)
-                    filelist.append(filename)
-                    if not self.videoService.cut(source='{0}{1}'.format(source_file, source_ext),
-                                                 output=filename,
-                                                 frametime=clip[0].toString(self.timeformat),
-                                                 duration=duration,
-                                                 allstreams=True):
-                        self.completeOnError('<p>Failed to cut media file, assuming media is invalid or corrupt. '
-                                             'Attempts are made to work around problematic media files, even '
-                                             'when keyframes are incorrectly set or missing.</p><p>If you feel this '
-                                             'is a bug in the software then please take the time to report it '
-                                             'at our <a href="{}">GitHub Issues page</a> so that it can be fixed.</p>'
-                                             .format(vidcutter.__bugreport__))
-                        return
-            self.joinMedia(filelist)
+            self.exportProgress()
+            # plain cuts block until done, give the progress dialog a chance to show before they start
+            QTimer.singleShot(0, partial(self.cutter, file, source_file, source_ext))
+
+    def exportProgress(self) -> None:
+        self.exportProgressBar = VCProgressDialog(self, modal=False)
+        self.exportProgressBar.reset(1000, timer=True)
+        self.exportProgressBar.setText('Saving media')
+        self.exportProgressBar.setMinimumWidth(600)
+        self.exportProgressBar.show()
+
+    def cutter(self, file: str, source_file: str, source_ext: str) -> None:
+        filename, filelist = '', []
+        for index, clip in enumerate(self.clipTimes):
+            self.clipProgress(index)
+            if len(clip[3]) and not self.isTrimmed(clip):
+                filelist.append(clip[3])
+            else:
+                duration = self.delta2QTime(clip[0].msecsTo(clip[1])).toString(self.timeformat)
+                filename = '{0}_{1}{2}'.format(file, '{0:0>2}'.format(index), source_ext)
+                if self.exportPlan.direct:
+                    filename = self.finalFilename
+                elif not self.keepClips:
+                    filename = os.path.join(self.exportPlan.workfolder, os.path.basename(filename))
+                filename = QDir.toNativeSeparators(filename)
+                completed = self.journal.completed(index)
+                if completed is not None:
+                    filelist.append(completed)
+                    continue
+                filelist.append(filename)
+                if self.exportKeys[index] is not None:
+                    if self.videoService.segmentcache.fetch(self.exportKeys[index], filename):
+                        continue
+                    elif os.path.isfile(filename):
+                        # a leftover work file may share its data with a cached clip, never overwrite it in place
+                        os.remove(filename)
+                if not self.videoService.cut(source=clip[3] if len(clip[3])
+                                             else '{0}{1}'.format(source_file, source_ext),
+                                             output=filename,
+                                             frametime=clip[0].toString(self.timeformat),
+                                             duration=duration,
+                                             allstreams=True,
+                                             progress=partial(self.videoService.telemetry.update, index, 'copy'),
+                                             final=self.exportPlan.direct):
+                    self.completeOnError('<p>Failed to cut media file, assuming media is invalid or corrupt. '
+                                         'Attempts are made to work around problematic media files, even '
+                                         'when keyframes are incorrectly set or missing.</p><p>If you feel this '
+                                         'is a bug in the software then please take the time to report it '
+                                         'at our <a href="{}">GitHub Issues page</a> so that it can be fixed.</p>'
+                                         .format(vidcutter.__bugreport__))
+                    return
+                if self.exportKeys[index] is not None:
+                    self.videoService.segmentcache.store(self.exportKeys[index], filename)
+                self.journal.complete(index, filename)
+        self.joinMedia(filelist)
+
+    def journalClips(self) -> List[list]:
+        return [
+            [clip[0].msecsSinceStartOfDay(), clip[1].msecsSinceStartOfDay(), clip[3], clip[4]]
+            for clip in self.clipTimes
+        ]
+
+    def resumeExport(self) -> None:
+        # an export journal left behind means the app crashed or was closed midway through an export
+        job = self.journal.load()
+        if job is None:
+            return
+        sources = [job.media] if job.media is not None else []
+        sources += [clip[2] for clip in job.clips if len(clip[2])]
+        if job.joined and os.path.isfile(job.output):
+            self.journal.finish()
+            return
+        if False in [os.path.isfile(source) for source in sources]:
+            self.logger.info('discarding unfinished export, its source media is missing')
+            self.discardExport()
+            return
+        if QMessageBox.question(self.parent, 'Resume export',
+                                '<p>The export to <b>{}</b> did not finish.</p><p>Would you like to resume it from '
+                                'the last completed clip?</p>'.format(os.path.basename(job.output)),
+                                QMessageBox.Yes | QMessageBox.No) != QMessageBox.Yes:
+            self.discardExport()
+            return
+        if job.media is not None:
+            self.loadMedia(job.media)
+        for start, end, external, chapter in job.clips:
+            starttime, endtime = QTime(0, 0).addMSecs(start), QTime(0, 0).addMSecs(end)
+            self.clipTimes.append([starttime, endtime,
+                                   self.captureImage(external if len(external) else job.media, starttime,
+                                                     len(external) > 0),
+                                   external, chapter])
+        self.renderClipIndex()
+        self.finalFilename = job.output
+        self.lastFolder = QFileInfo(self.finalFilename).absolutePath()
+        self.exportMedia()
+
+    def discardExport(self) -> None:
+        job = self.journal.job
+        if job is not None:
+            # kept clips and direct exports live beside the output, only work files are removed
+            for entry in job.completed.values():
+                if os.path.dirname(entry.file) != os.path.dirname(job.output) and os.path.isfile(entry.file):
+                    os.remove(entry.file)
+        self.journal.finish()
+
+    def incrementalKeys(self) -> List[Optional[str]]:
+        # plain cuts are cached as whole clips when exporting incrementally. SmartCut clips are cached at segment
+        # level by VideoService.smartcut instead, so their data is only ever stored once
+        if not self.incrementalExport or self.smartcut or self.keepClips or self.exportPlan.direct \
+                or self.currentMedia is None:
+            return [None] * len(self.clipTimes)
+        return [
+            None if len(clip[3]) and not self.isTrimmed(clip)
+            else self.videoService.clipKey(clip[3] if len(clip[3]) else self.currentMedia, self.finalFilename,
+                                           VideoCutter.qtime2delta(clip[0]), VideoCutter.qtime2delta(clip[1]))
+            for clip in self.clipTimes
+        ]
 
     def smartcutter(self, file: str, source_file: str, source_ext: str) -> None:
         self.smartcut_monitor = Munch(clips=[], results=[], externals=0)
         for index, clip in enumerate(self.clipTimes):
-            if len(clip[3]):
+            if len(clip[3]) and not self.isTrimmed(clip):
                 self.smartcut_monitor.clips.append(clip[3])
                 self.smartcut_monitor.externals += 1
-                if index == len(self.clipTimes):
-                    self.smartmonitor()
             else:
                 filename = '{0}_{1}{2}'.format(file, '{0:0>2}'.format(index), source_ext)
                 if not self.keepClips:
-                    filename = os.path.join(self.workFolder, os.path.basename(filename))
+                    filename = os.path.join(self.exportPlan.workfolder, os.path.basename(filename))
                 filename = QDir.toNativeSeparators(filename)
+                completed = self.journal.completed(index)
+                if completed is not None:
+                    self.smartcut_monitor.clips.append(completed)
+                    QTimer.singleShot(0, partial(self.smartmonitor, True, completed))
+                    continue
                 self.smartcut_monitor.clips.append(filename)
                 self.videoService.smartcut(index=index,
-                                           source='{0}{1}'.format(source_file, source_ext),
+                                           source=clip[3] if len(clip[3]) else '{0}{1}'.format(source_file,
+                                                                                               source_ext),
                                            output=filename,
                                            start=VideoCutter.qtime2delta(clip[0]),
                                            end=VideoCutter.qtime2delta(clip[1]),
-                                           allstreams=True)
+                                           allstreams=True,
+                                           final=len(self.clipTimes) == 1)
+        # nothing left to wait on when every clip is an untrimmed media file
+        self.smartmonitor()
 
     @pyqtSlot(bool, str)
     def smartmonitor(self, success: bool = None, outputfile: str = None) -> None:
         if success is not None:
             if not success:
                 self.logger.error('SmartCut failed for {}'.format(outputfile))
+            else:
+                self.journal.complete(self.smartcut_monitor.clips.index(outputfile), outputfile)
             self.smartcut_monitor.results.append(success)
         if len(self.smartcut_monitor.results) == len(self.smartcut_monitor.clips) - self.smartcut_monitor.externals:
             if False not in self.smartcut_monitor.results:
@@ -1424,39 +1809,52 @@ class VideoCutter(QWidget):
         if len(filelist) > 1:
             self.seekSlider.updateProgress()
             rc = False
-            chapters = None
+            chapters, durations = None, None
             if self.createChapters:
                 chapters = []
                 [
                     chapters.append(clip[4] if clip[4] is not None else 'Chapter {}'.format(index + 1))
                     for index, clip in enumerate(self.clipTimes)
                 ]
+                # chapter lengths are taken from the clip index when cuts are exact, i.e. SmartCut or starts snapped
+                # to keyframes, and untrimmed media files. a plain stream copy starts at the keyframe before the
+                # clip so those files are probed instead
+                exact = self.smartcut or self.keyframeSnap != 'off'
+                durations = [clip[0].msecsTo(clip[1]) if exact or (len(clip[3]) and not self.isTrimmed(clip))
+                             else None for clip in self.clipTimes]
             if self.videoService.isMPEGcodec(filelist[0]):
                 self.logger.info('source file is MPEG based so join via MPEG-TS')
-                rc = self.videoService.mpegtsJoin(filelist, self.finalFilename, chapters)
+                rc = self.videoService.mpegtsJoin(filelist, self.finalFilename, chapters, durations, final=True)
             if not rc or QFile(self.finalFilename).size() < 1000:
                 self.logger.info('MPEG-TS based join failed, will retry using standard concat')
-                rc = self.videoService.join(filelist, self.finalFilename, True, chapters)
+                rc = self.videoService.join(filelist, self.finalFilename, True, chapters, durations, final=True)
             if not rc or QFile(self.finalFilename).size() < 1000:
                 self.logger.info('join resulted in 0 length file, trying again without all stream mapping')
-                self.videoService.join(filelist, self.finalFilename, False, chapters)
+                self.videoService.join(filelist, self.finalFilename, False, chapters, durations, final=True)
+            self.journal.join()
             if not self.keepClips:
                 for f in filelist:
                     clip = self.clipTimes[filelist.index(f)]
-                    if not len(clip[3]) and os.path.isfile(f):
+                    if f != clip[3] and os.path.isfile(f):
                         QFile.remove(f)
             self.complete(False)
         else:
             self.complete(True, filelist[-1])
 
     def complete(self, rename: bool=True, filename: str=None) -> None:
-        if rename and filename is not None:
+        if rename and filename is not None and filename != QDir.toNativeSeparators(self.finalFilename):
             # noinspection PyCallByClass
             QFile.remove(self.finalFilename)
             # noinspection PyCallByClass
             QFile.rename(filename, self.finalFilename)
         self.videoService.finalize(self.finalFilename)
+        self.journal.finish()
+        if self.exportPlan is not None:
+            self.planner.recordThroughput(self.exportPlan.mode,
+                                          self.exportPlan.tempsize + QFileInfo(self.finalFilename).size(),
+                                          time.time() - self.exportStarted)
         self.seekSlider.updateProgress()
+        self.closeExportProgress()
         self.toolbar_save.setEnabled(True)
         self.parent.lock_gui(False)
         self.notify = JobCompleteNotification(
@@ -1473,14 +1871,22 @@ class VideoCutter(QWidget):
 
     @pyqtSlot(str)
     def completeOnError(self, errormsg: str) -> None:
+        # only an interrupted export is offered for resuming, a failed one is not
+        self.discardExport()
         if self.smartcut:
             self.videoService.smartabort()
             QTimer.singleShot(1500, self.cleanup)
         self.parent.lock_gui(False)
         self.seekSlider.clearProgress()
+        self.closeExportProgress()
         self.toolbar_save.setEnabled(True)
         self.parent.errorHandler(errormsg)
 
+    def closeExportProgress(self) -> None:
+        if hasattr(self, 'exportProgressBar'):
+            self.exportProgressBar.close()
+            delattr(self, 'exportProgressBar')
+
     def cleanup(self) -> None:
         if hasattr(self.videoService, 'smartcut_jobs'):
             delattr(self.videoService, 'smartcut_jobs')
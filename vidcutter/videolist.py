@@ -102,6 +102,10 @@ class VideoList(QListWidget):
             else:
                 self._progressbars[item].setValue(self._progressbars[item].value() + 1)
 
+    def updateTelemetry(self, item: int, fraction: float, text: str) -> None:
+        if item < len(self._progressbars):
+            self._progressbars[item].setTelemetry(fraction, text)
+
     @pyqtSlot()
     def clearProgress(self) -> None:
         for progress in self._progressbars:
@@ -205,3 +209,10 @@ class ListProgress(QProgressBar):
         palette.setColor(QPalette.Highlight, QColor(100, 44, 104))
         self.setPalette(palette)
         self.show()
+
+    def setTelemetry(self, fraction: float, text: str) -> None:
+        # live progress moves the bar within the cut steps, the final steps are left for joining
+        self.setValue(max(self.value(), int(fraction * max(self.maximum() - 2, 1))))
+        if len(text):
+            self.setFormat(text)
+            self.setToolTip(text)
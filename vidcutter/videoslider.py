@@ -235,6 +235,13 @@ class VideoSlider(QSlider):
         else:
             self.parent.cliplist.updateProgress(region)
 
+    def updateTelemetry(self, region: int, fraction: float, text: str) -> None:
+        if len(self._regions):
+            if region < len(self._progressbars):
+                self._progressbars[region].setTelemetry(fraction, text)
+        else:
+            self.parent.cliplist.updateTelemetry(region, fraction, text)
+
     @pyqtSlot()
     def clearProgress(self) -> None:
         for progress in self._progressbars:
@@ -405,3 +412,10 @@ class SliderProgress(QProgressBar):
         palette.setColor(QPalette.Highlight, QColor(100, 44, 104))
         self.setPalette(palette)
         self.show()
+
+    def setTelemetry(self, fraction: float, text: str) -> None:
+        # live progress moves the bar within the cut steps, the final steps are left for joining
+        self.setValue(max(self.value(), int(fraction * max(self.maximum() - 2, 1))))
+        if len(text):
+            self.setFormat(text)
+            self.setToolTip(text)